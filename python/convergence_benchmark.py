@@ -0,0 +1,64 @@
+"""Compare the number of iteration steps and the wall time of the accelerated iteration schemes against the plain iteration on the shipped model.
+
+Usage: python convergence_benchmark.py [R] [T]
+"""
+import sys
+import time
+import numpy as np
+from tnmp.read_model import read_model
+from tnmp.message_passing import neighborhoods_generator, plans_generator, message_passing, marginals_calculate
+
+
+SCHEMES = {
+    "plain": {},
+    "adaptive damping": {"adaptive_damping": True},
+    "anderson": {"anderson_depth": 5},
+    "adaptive damping + anderson": {"adaptive_damping": True, "anderson_depth": 5},
+}
+
+
+def convergence_benchmark(G, J, h, R, T, epsilon=1e-6, step_limit=10000):
+    """Run every scheme in SCHEMES on the same model and print the iteration steps and the wall time saved against the plain iteration.
+
+    Parameters
+    ----------
+    G : nx.Graph
+        The complete graph.
+    J : array
+        The coupling constants array with a shape of [n, n].
+    h : array
+        The field array with a shape of [n].
+    R : int
+    T : float
+        The temperature.
+    epsilon : float
+        The convergence threshold of the maximum difference of the message vectors.
+    step_limit : int
+        The maximum number of iteration steps.
+
+    Returns
+    -------
+    results : dict[str,tuple]
+        results[scheme] = (number of iteration steps, wall time in seconds, marginals array with a shape of [2, n]).
+    """
+    Nv, Ne, boundaries = neighborhoods_generator(G, R)
+    cavity_plans, neighborhood_plans = plans_generator(Nv, Ne, boundaries)
+    beta = 1/T
+    results = {}
+    for scheme, options in SCHEMES.items():
+        start = time.perf_counter()
+        cavity, step, _ = message_passing(J, h, Nv, boundaries, cavity_plans, beta, epsilon=epsilon, step_limit=step_limit, **options)
+        wall_time = time.perf_counter() - start
+        results[scheme] = (step, wall_time, marginals_calculate(J, h, cavity, neighborhood_plans, beta))
+    step_plain, time_plain, marginals_plain = results["plain"]
+    for scheme, (step, wall_time, marginals) in results.items():
+        print("{:<30s} steps: {:>6d} (saved {:>6d}),  time: {:>8.2f}s (saved {:>8.2f}s),  max marginal deviation: {:.2e}".format(
+            scheme, step, step_plain - step, wall_time, time_plain - wall_time, np.abs(marginals - marginals_plain).max()))
+    return results
+
+
+if __name__ == "__main__":
+    R = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    T = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    G, J, h = read_model("494bus_G", "494bus_J_random", "494bus_h_random")
+    convergence_benchmark(G, J, h, R, T)
@@ -0,0 +1,24 @@
+"""Tensor Network Message Passing.
+
+The compute path (model loading, neighborhoods, contraction and message passing) only depends on NumPy and NetworkX.
+The plotting helpers in tnmp.plot need matplotlib, seaborn and IPython and are only imported on first use.
+"""
+import importlib
+from .read_model import read_model, read_models
+from .local_subgraph_generator import Ni_generator, neighborhood_grow, cavity_subgraph_generator
+from .local_tensor_network_contraction import contraction_plan, local_contraction, tensor_contraction, ising_tensors, potts_tensors
+from .message_passing import (neighborhoods_generator, plans_generator, message_passing, marginals_calculate,
+                              tensor_message_passing, tensor_marginals_calculate)
+from .checkpoint import checkpoint_load
+from .exact_solver import exact_marginals, exact_tensor_marginals, exact_marginals_save, exact_marginals_load, marginals_error
+
+PLOT_FUNCTIONS = ["get_layer_environment_node", "get_layer_environment_gsub", "neighborhood_show", "cavity_show",
+                  "tensor_network_show", "process_animation_show", "graph_draw"]
+
+
+def __getattr__(name):
+    if name == "plot":
+        return importlib.import_module(".plot", __name__)
+    if name in PLOT_FUNCTIONS:
+        return getattr(importlib.import_module(".plot", __name__), name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
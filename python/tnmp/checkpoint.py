@@ -0,0 +1,194 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+STATE_FILE = "state.json"
+NEIGHBORHOODS_FILE = "neighborhoods.json"
+
+
+def atomic_json_dump(data, file):
+    """Write data to the json file through a temporary file which atomically replaces it,
+    so that the file always contains either the old or the new data even if the process is killed while writing.
+
+    Parameters
+    ----------
+    data : dict
+    file : str
+        The path of the json file.
+    """
+    with open(file + ".tmp", "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(file + ".tmp", file)
+
+
+
+def graph_fingerprint(G):
+    """The fingerprint of the nodes and edges of G, which identifies the graph of saved neighborhoods.
+
+    Parameters
+    ----------
+    G : nx.Graph
+
+    Returns
+    -------
+    fingerprint : str
+        The sha1 hex digest of the sorted nodes and edges of G.
+    """
+    nodes = sorted(G.nodes())
+    edges = sorted(tuple(sorted(edge)) for edge in G.edges())
+    return hashlib.sha1(json.dumps([nodes, edges]).encode()).hexdigest()
+
+
+
+def tensors_fingerprint(edge_tensors, vertex_tensors):
+    """The fingerprint of the edge tensors and vertex tensors, which identifies the model of a saved iteration state.
+
+    Parameters
+    ----------
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the tensor on the edge (i, j).
+    vertex_tensors : array
+        The vertex tensors array.
+
+    Returns
+    -------
+    fingerprint : str
+        The sha1 hex digest of the edges and the shapes and values of all the tensors.
+    """
+    digest = hashlib.sha1()
+    for edge in sorted(edge_tensors):
+        tensor = np.ascontiguousarray(edge_tensors[edge], dtype=float)
+        digest.update(repr((edge, tensor.shape)).encode())
+        digest.update(tensor.tobytes())
+    vertex_tensors = np.ascontiguousarray(vertex_tensors, dtype=float)
+    digest.update(repr(vertex_tensors.shape).encode())
+    digest.update(vertex_tensors.tobytes())
+    return digest.hexdigest()
+
+
+
+def metadata_match(saved_metadata, metadata):
+    """True if the metadata saved in a json file equals metadata, e.g. after tuples have become lists, and otherwise False."""
+    return saved_metadata == json.loads(json.dumps(metadata))
+
+
+
+def checkpoint_save(checkpoint_dir, cavity, step, differences, metadata=None):
+    """Persist the state of the iteration to checkpoint_dir.
+
+    The message vectors are written to a new memory-mapped .npy file, and the state file pointing to it is swapped atomically afterwards,
+    so a checkpoint is either completely written or not visible at all.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        The directory of the checkpoint, which is created if it does not exist.
+    cavity : array
+        The message vectors array with a shape of [..., n, n, 2].
+    step : int
+        The number of iteration steps performed.
+    differences : list of float
+        differences[t] = the maximum difference of the message vectors in the (t+1)-th step.
+    metadata : dict, optional
+        The parameters of the run (e.g. beta, the shape of cavity and the fingerprint of the tensors), which are checked by checkpoint_load.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    cavity_file = "cavity_{}.npy".format(step)
+    messages = np.lib.format.open_memmap(os.path.join(checkpoint_dir, cavity_file + ".tmp"), mode="w+", dtype=cavity.dtype, shape=cavity.shape)
+    messages[...] = cavity
+    messages.flush()
+    del messages
+    os.replace(os.path.join(checkpoint_dir, cavity_file + ".tmp"), os.path.join(checkpoint_dir, cavity_file))
+    atomic_json_dump({"step": step, "differences": differences, "cavity_file": cavity_file, "metadata": metadata},
+                     os.path.join(checkpoint_dir, STATE_FILE))
+    for file in os.listdir(checkpoint_dir):
+        if file.startswith("cavity_") and file != cavity_file:
+            os.remove(os.path.join(checkpoint_dir, file))
+
+
+
+def checkpoint_load(checkpoint_dir, mmap_mode="r", metadata=None):
+    """Map the latest checkpoint in checkpoint_dir without copying the message vectors into memory.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        The directory of the checkpoint.
+    mmap_mode : str
+        The mode of np.load, "r" to map a finished run read-only (e.g. for marginals_calculate) and "c" (copy-on-write) to resume the iteration
+        without modifying the checkpoint.
+    metadata : dict, optional
+        If given, the metadata the checkpoint must have been saved with.
+
+    Returns
+    -------
+    checkpoint : tuple or None
+        (cavity, step, differences) as saved by checkpoint_save, or None if there is no checkpoint in checkpoint_dir.
+
+    Raises
+    ------
+    ValueError
+        If metadata is given and the checkpoint was saved by a run with other parameters.
+    """
+    state_file = os.path.join(checkpoint_dir, STATE_FILE)
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file) as f:
+        state = json.load(f)
+    if metadata is not None and not metadata_match(state.get("metadata"), metadata):
+        raise ValueError("The checkpoint in {} was saved by a run with other parameters ({} instead of {}), use another checkpoint_dir."
+                         .format(checkpoint_dir, state.get("metadata"), metadata))
+    cavity = np.load(os.path.join(checkpoint_dir, state["cavity_file"]), mmap_mode=mmap_mode)
+    return cavity, state["step"], state["differences"]
+
+
+
+def neighborhoods_save(checkpoint_dir, Nv, Ne, boundaries, metadata=None):
+    """Persist the neighborhoods to checkpoint_dir, so that a restarted run does not need to regenerate them.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        The directory of the checkpoint, which is created if it does not exist.
+    Nv : list of list of int
+        The list of the vertex lists of all the G_N, Nv[i] = list(V(G_N_i)).
+    Ne : list of list of tuple of int
+        The list of the edge lists of all the G_N, Ne[i] = list(E(G_N_i)).
+    boundaries : list of list of int
+        The list of the boundary node lists of all the G_N, boundaries[i] = boundary nodes list of G_N_i.
+    metadata : dict, optional
+        The parameters of the neighborhoods (R and the fingerprint of the graph), which are checked by neighborhoods_load.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    atomic_json_dump({"Nv": Nv, "Ne": Ne, "boundaries": boundaries, "metadata": metadata}, os.path.join(checkpoint_dir, NEIGHBORHOODS_FILE))
+
+
+
+def neighborhoods_load(checkpoint_dir, metadata=None):
+    """Load the neighborhoods saved by neighborhoods_save.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        The directory of the checkpoint.
+    metadata : dict, optional
+        If given, the metadata the neighborhoods must have been saved with.
+
+    Returns
+    -------
+    neighborhoods : tuple or None
+        (Nv, Ne, boundaries) in the same format as neighborhoods_generator, 
+        or None if they are not saved in checkpoint_dir or were saved with other metadata.
+    """
+    neighborhoods_file = os.path.join(checkpoint_dir, NEIGHBORHOODS_FILE)
+    if not os.path.exists(neighborhoods_file):
+        return None
+    with open(neighborhoods_file) as f:
+        neighborhoods = json.load(f)
+    if metadata is not None and not metadata_match(neighborhoods.get("metadata"), metadata):
+        return None
+    Ne = [[tuple(edge) for edge in Ni_e] for Ni_e in neighborhoods["Ne"]]
+    return neighborhoods["Nv"], Ne, neighborhoods["boundaries"]
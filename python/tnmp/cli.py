@@ -0,0 +1,266 @@
+"""Command-line batch runner of TNMP parameter sweeps.
+
+Every combination of model, R, T and damping factor is a job. The neighborhoods and the contraction plans of every (graph, R) pair are generated
+once by a single worker and saved to the output directory, from which all the jobs on the same graph and R load them. The jobs run in a process pool, and the marginals
+and the timing of every job are written to the output directory as soon as it finishes, so an interrupted sweep can simply be restarted and
+only runs the unfinished jobs.
+
+Example: python -m tnmp --model 494bus_G 494bus_J_random 494bus_h_random -R 1 2 3 -T 1.0 2.0 --damping 0 0.5 --workers 4 --output results
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .read_model import read_graph, read_model
+from .message_passing import neighborhoods_generator, plans_generator, message_passing, marginals_calculate
+from .checkpoint import graph_fingerprint
+from .exact_solver import exact_marginals_save
+
+TIMING_FILE = "timing.csv"
+TIMING_COLUMNS = ["job", "graph", "couplings", "fields", "R", "T", "damping", "method", "max_intermediate_size", "options", "steps", "difference",
+                  "plan_time", "iteration_time", "marginal_time", "total_time", "error"]
+# the options of message_passing which do not change the marginals of a job
+OUTPUT_OPTIONS = ["checkpoint", "checkpoint_interval", "verbose"]
+
+
+def neighborhoods_dir(output, G_file, R):
+    """The directory in output storing the neighborhoods of the graph G_file with R."""
+    return os.path.join(output, "neighborhoods", "{}_R{}".format(G_file, R))
+
+
+
+def plans_file(output, G_file, R, method, max_intermediate_size):
+    """The file in output storing the contraction plans of the graph G_file with R, method and max_intermediate_size."""
+    return os.path.join(neighborhoods_dir(output, G_file, R), "plans_{}_max{}.pkl".format(method, max_intermediate_size))
+
+
+
+def job_options(job):
+    """The options of a job which change its marginals, as "key=value" pairs separated by ";" in the order of the keys."""
+    options = {key: value for key, value in job["options"].items() if key not in OUTPUT_OPTIONS}
+    return ";".join("{}={}".format(key, options[key]) for key in sorted(options))
+
+
+
+def job_name(job):
+    """The name of a job, which is also the prefix of its output files.
+    It ends with a short digest of the model path and job_options(job), so that jobs with other options are not mistaken for finished ones."""
+    name = "{}_{}_{}_R{}_T{}_damping{}_{}".format(job["G_file"], job["J_file"], job["h_file"], job["R"], job["T"], job["damping"], job["method"])
+    if job["max_intermediate_size"] is not None:
+        name += "_max{}".format(job["max_intermediate_size"])
+    digest = hashlib.sha1(json.dumps([job["path"], job_options(job)]).encode()).hexdigest()[:8]
+    return name + "_" + digest
+
+
+
+def plans_job(path, G_file, R, output, method, max_intermediate_size):
+    """Generate the neighborhoods and the contraction plans of the graph G_file with R and save them to output,
+    unless they have been saved there before for the same graph.
+
+    Returns
+    -------
+    wall_time : float
+        The wall time of the generation in seconds.
+    """
+    start = time.perf_counter()
+    G = read_graph(G_file, path)
+    Nv, Ne, boundaries = neighborhoods_generator(G, R, neighborhoods_dir(output, G_file, R))
+    file = plans_file(output, G_file, R, method, max_intermediate_size)
+    fingerprint = graph_fingerprint(G)
+    if os.path.exists(file):
+        with open(file, "rb") as f:
+            if pickle.load(f)["graph"] == fingerprint:
+                return time.perf_counter() - start
+    plans = plans_generator(Nv, Ne, boundaries, method, max_intermediate_size)
+    with open(file + ".tmp", "wb") as f:
+        pickle.dump({"graph": fingerprint, "plans": plans}, f)
+    os.replace(file + ".tmp", file)
+    return time.perf_counter() - start
+
+
+
+def message_passing_job(job):
+    """Run TNMP for a single job and save its marginals to output in the csv format of exact_marginals_save.
+
+    Parameters
+    ----------
+    job : dict
+        The parameters of the job, with the keys "path", "G_file", "J_file", "h_file", "R", "T", "damping", "output", "method",
+        "max_intermediate_size" and "options", where job["options"] are the keyword arguments passed to message_passing.
+
+    Returns
+    -------
+    timing : dict
+        The number of iteration steps, the final difference and the wall time of every stage of the job, with the keys of TIMING_COLUMNS.
+    """
+    start = time.perf_counter()
+    name = job_name(job)
+    G, J, h = read_model(job["G_file"], job["J_file"], job["h_file"], job["path"])
+    Nv, Ne, boundaries = neighborhoods_generator(G, job["R"], neighborhoods_dir(job["output"], job["G_file"], job["R"]))
+    with open(plans_file(job["output"], job["G_file"], job["R"], job["method"], job["max_intermediate_size"]), "rb") as f:
+        cavity_plans, neighborhood_plans = pickle.load(f)["plans"]
+    plan_time = time.perf_counter() - start
+
+    options = dict(job["options"])
+    if options.pop("checkpoint", False):
+        options["checkpoint_dir"] = os.path.join(job["output"], "checkpoints", name)
+    beta = 1/job["T"]
+    cavity, step, differences = message_passing(J, h, Nv, boundaries, cavity_plans, beta, damping_factor=job["damping"], **options)
+    iteration_time = time.perf_counter() - start - plan_time
+
+    marginals = marginals_calculate(J, h, cavity, neighborhood_plans, beta)
+    # the marginals file marks the job as finished, so it only appears once it is completely written
+    marginals_file = os.path.join(job["output"], name + "_marginals.csv")
+    exact_marginals_save(marginals_file + ".tmp", marginals)
+    os.replace(marginals_file + ".tmp", marginals_file)
+    total_time = time.perf_counter() - start
+
+    timing = job_timing(job)
+    timing.update({"steps": step, "difference": differences[-1] if len(differences) != 0 else "",
+                   "plan_time": plan_time, "iteration_time": iteration_time, "marginal_time": total_time - plan_time - iteration_time,
+                   "total_time": total_time})
+    return timing
+
+
+
+def job_timing(job):
+    """The timing row of a job with its parameters filled in and all the other keys of TIMING_COLUMNS empty."""
+    timing = {column: "" for column in TIMING_COLUMNS}
+    timing.update({"job": job_name(job), "graph": job["G_file"], "couplings": job["J_file"], "fields": job["h_file"], "R": job["R"], "T": job["T"],
+                   "damping": job["damping"], "method": job["method"], "options": job_options(job),
+                   "max_intermediate_size": job["max_intermediate_size"] if job["max_intermediate_size"] is not None else ""})
+    return timing
+
+
+
+def failed_timing(job, error):
+    """The timing row of a job which raised error, with the keys of TIMING_COLUMNS."""
+    timing = job_timing(job)
+    timing.update({"error": " ".join("{}: {}".format(type(error).__name__, error).replace(",", ";").split())})
+    return timing
+
+
+
+def timing_write(f, timing):
+    """Append the timing row of a job to the opened TIMING_FILE and report the job."""
+    f.write(",".join(str(timing[column]) for column in TIMING_COLUMNS) + "\n")
+    f.flush()
+    if timing["error"]:
+        print("failed {}: {}".format(timing["job"], timing["error"]), file=sys.stderr, flush=True)
+    else:
+        print("finished {} in {:.2f}s ({} steps)".format(timing["job"], timing["total_time"], timing["steps"]), flush=True)
+
+
+
+def sweep(models, Rs, Ts, dampings, output, path="constants", workers=None, method="greedy", max_intermediate_size=None, options=None):
+    """Run all the combinations of models, Rs, Ts and dampings in a process pool and stream the results to output.
+
+    Parameters
+    ----------
+    models : list of tuple of str
+        models[k] = (G_file, J_file, h_file) in the format of read_model.
+    Rs : list of int
+    Ts : list of float
+        The temperatures.
+    dampings : list of float
+        The damping factors.
+    output : str
+        The output directory, which contains the marginals "<job>_marginals.csv" of every finished job and the timing of all the jobs in TIMING_FILE.
+        A failed job does not stop the sweep, it gets a timing row with its error and is run again by the next sweep.
+    path : str
+        The directory containing the model files.
+    workers : int, optional
+        The number of worker processes, by default the number of processors.
+    method : str
+        The method of contraction_plan.
+    max_intermediate_size : int, optional
+        The maximum number of elements of an intermediate tensor, see contraction_plan.
+    options : dict, optional
+        The keyword arguments passed to message_passing, plus "checkpoint": True to checkpoint every job in output.
+
+    Returns
+    -------
+    timings : list of dict
+        The timing of every job run in this call, in the order of completion.
+    """
+    os.makedirs(output, exist_ok=True)
+    jobs = {}
+    for (G_file, J_file, h_file), R, T, damping in itertools.product(models, Rs, Ts, dampings):
+        job = {"path": path, "G_file": G_file, "J_file": J_file, "h_file": h_file, "R": R, "T": T, "damping": damping, "output": output,
+               "method": method, "max_intermediate_size": max_intermediate_size, "options": options or {}}
+        if not os.path.exists(os.path.join(output, job_name(job) + "_marginals.csv")):
+            jobs[job_name(job)] = job
+    jobs = list(jobs.values())
+    if len(jobs) == 0:
+        return []
+
+    timing_file = os.path.join(output, TIMING_FILE)
+    new_timing_file = not os.path.exists(timing_file)
+    timings = []
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(timing_file, "a") as f:
+        if new_timing_file:
+            f.write(",".join(TIMING_COLUMNS) + "\n")
+            f.flush()
+        neighborhood_futures = {}
+        for key in dict.fromkeys((job["G_file"], job["R"]) for job in jobs):
+            neighborhood_futures[executor.submit(plans_job, path, key[0], key[1], output, method, max_intermediate_size)] = key
+        job_futures = {}
+        for future in as_completed(neighborhood_futures):
+            key = neighborhood_futures[future]
+            key_jobs = [job for job in jobs if (job["G_file"], job["R"]) == key]
+            try:
+                future.result()
+            except Exception as error:
+                for job in key_jobs:
+                    timings.append(failed_timing(job, error))
+                    timing_write(f, timings[-1])
+                continue
+            for job in key_jobs:
+                job_futures[executor.submit(message_passing_job, job)] = job
+        for future in as_completed(job_futures):
+            try:
+                timing = future.result()
+            except Exception as error:
+                timing = failed_timing(job_futures[future], error)
+            timing_write(f, timing)
+            timings.append(timing)
+    return timings
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tnmp", description="Run TNMP parameter sweeps in a process pool.")
+    parser.add_argument("--model", nargs=3, action="append", required=True, metavar=("G_FILE", "J_FILE", "H_FILE"),
+                        help="model files in the format of read_model (without extensions), can be repeated")
+    parser.add_argument("--path", default="constants", help="directory containing the model files")
+    parser.add_argument("-R", nargs="+", type=int, required=True, help="neighborhood sizes")
+    parser.add_argument("-T", nargs="+", type=float, required=True, help="temperatures")
+    parser.add_argument("--damping", nargs="+", type=float, default=[0.0], help="damping factors")
+    parser.add_argument("--output", required=True, help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--epsilon", type=float, default=1e-6, help="convergence threshold")
+    parser.add_argument("--step-limit", type=int, default=10000, help="maximum number of iteration steps")
+    parser.add_argument("--adaptive-damping", action="store_true", help="use adaptive per-message damping")
+    parser.add_argument("--anderson-depth", type=int, default=0, help="depth of the Anderson extrapolation, 0 to disable")
+    parser.add_argument("--method", default="greedy", choices=["greedy", "min_fill", "min_degree"], help="contraction planner")
+    parser.add_argument("--max-intermediate-size", type=int, default=None, help="maximum intermediate tensor size, enables slicing")
+    parser.add_argument("--checkpoint-interval", type=int, default=None, help="checkpoint every job every given number of steps")
+    args = parser.parse_args(argv)
+    if args.max_intermediate_size is not None:
+        if args.method == "greedy":
+            parser.error("--max-intermediate-size requires --method min_fill or min_degree")
+        if args.max_intermediate_size < 2:
+            parser.error("--max-intermediate-size must be at least the bond dimension 2")
+
+    options = {"epsilon": args.epsilon, "step_limit": args.step_limit, "adaptive_damping": args.adaptive_damping,
+               "anderson_depth": args.anderson_depth}
+    if args.checkpoint_interval is not None:
+        options["checkpoint"] = True
+        options["checkpoint_interval"] = args.checkpoint_interval
+    sweep([tuple(model) for model in args.model], args.R, args.T, args.damping, args.output, args.path, args.workers,
+          args.method, args.max_intermediate_size, options)
@@ -0,0 +1,122 @@
+import networkx as nx
+
+
+def elimination_order(G_local, open_bond, method="min_fill"):
+    """Generate an elimination order of the bonds of the local tensor network defined on G_local from the graph G_local itself.
+
+    Eliminating a bond contracts all the tensors sharing it and sums it out, which leaves an intermediate tensor
+    on all the bonds adjacent to it and connects them with each other (the fill-in edges).
+
+    Parameters
+    ----------
+    G_local : nx.Graph
+        The corresponding subgraph of the local tensor network to be contracted.
+    open_bond : int or None
+        The node_id of the open bond, which is never eliminated, or None to eliminate all the bonds.
+    method : str
+        "min_fill" to eliminate the bond adding the fewest fill-in edges first,
+        "min_degree" to eliminate the bond with the fewest adjacent bonds first.
+
+    Returns
+    -------
+    order : list of int
+        The node_ids of all the bonds of G_local except open_bond in the order of elimination.
+    intermediate_bonds : list of list of int
+        intermediate_bonds[k] = the bonds of the intermediate tensor left by eliminating order[k].
+    """
+    if method not in ("min_fill", "min_degree"):
+        raise ValueError("Unknown elimination method: {}".format(method))
+    G_fill = nx.Graph(G_local)
+    order = []
+    intermediate_bonds = []
+    costs = {node: elimination_cost(G_fill, node, method) for node in G_fill.nodes() if node != open_bond}
+    while len(costs) != 0:
+        best_node = min(costs, key=costs.get)
+        neighbors = list(G_fill.neighbors(best_node))
+        for index1 in range(len(neighbors)):
+            for index2 in range(index1+1, len(neighbors)):
+                G_fill.add_edge(neighbors[index1], neighbors[index2])
+        G_fill.remove_node(best_node)
+        del costs[best_node]
+        order.append(best_node)
+        intermediate_bonds.append(neighbors)
+        affected_nodes = set(neighbors)
+        for neighbor in neighbors:
+            affected_nodes.update(G_fill.neighbors(neighbor))
+        for node in affected_nodes:
+            if node in costs:
+                costs[node] = elimination_cost(G_fill, node, method)
+    return order, intermediate_bonds
+
+
+
+def elimination_cost(G_fill, node, method):
+    """Compute the cost of eliminating node from G_fill in the elimination_order heuristics.
+
+    Parameters
+    ----------
+    G_fill : nx.Graph
+        The graph of the remaining bonds, including the fill-in edges of the previous eliminations.
+    node : int
+        The node_id of the bond to be eliminated.
+    method : str
+        "min_fill" or "min_degree".
+
+    Returns
+    -------
+    cost : tuple of int
+        (number of fill-in edges, number of adjacent bonds) for "min_fill" and (number of adjacent bonds, 0) for "min_degree".
+    """
+    neighbors = list(G_fill.neighbors(node))
+    if method == "min_degree":
+        return (len(neighbors), 0)
+    fill = 0
+    for index1 in range(len(neighbors)):
+        for index2 in range(index1+1, len(neighbors)):
+            if not G_fill.has_edge(neighbors[index1], neighbors[index2]):
+                fill += 1
+    return (fill, len(neighbors))
+
+
+
+def slicing_bonds(G_local, open_bond, max_intermediate_size, bond_dimension=2, method="min_fill"):
+    """Select the bonds to be sliced so that no intermediate tensor of the elimination of G_local is larger than max_intermediate_size.
+
+    A sliced bond is fixed to each of its values in turn and the contraction results of all the slices are summed up,
+    so the slices are independent of each other and can be contracted in any order or in parallel.
+
+    Parameters
+    ----------
+    G_local : nx.Graph
+        The corresponding subgraph of the local tensor network to be contracted.
+    open_bond : int or None
+        The node_id of the open bond, which is never sliced, or None if there is no open bond.
+    max_intermediate_size : int
+        The maximum number of elements of an intermediate tensor (for a single realization of J and h).
+    bond_dimension : int
+        The dimension of every bond.
+    method : str
+        The method of elimination_order.
+
+    Returns
+    -------
+    sliced_bonds : list of int
+        The node_ids of the sliced bonds.
+    order : list of int
+        The elimination order of the bonds of G_local which are neither sliced nor open_bond.
+    """
+    G_sliced = nx.Graph(G_local)
+    sliced_bonds = []
+    while True:
+        order, intermediate_bonds = elimination_order(G_sliced, open_bond, method)
+        counts = {}
+        for bonds in intermediate_bonds:
+            if bond_dimension ** len(bonds) > max_intermediate_size:
+                for bond in bonds:
+                    if bond != open_bond:
+                        counts[bond] = counts.get(bond, 0) + 1
+        if len(counts) == 0:
+            return sliced_bonds, order
+        bond = max(counts, key=lambda bond: (counts[bond], G_sliced.degree(bond)))
+        G_sliced.remove_node(bond)
+        sliced_bonds.append(bond)
@@ -0,0 +1,146 @@
+import numpy as np
+from .contraction_order import elimination_order, slicing_bonds
+from .local_tensor_network_contraction import (elimination_contraction, tensor_slices, oriented_edge_tensors, slices_sum, ising_tensors,
+                                               tensors_batch_shape)
+
+
+def exact_marginals(G, J, h, beta, method="min_fill", max_intermediate_size=None):
+    """Calculate the exact marginal of every vertex of the Ising model by contracting the tensor network of the whole graph G with variable elimination,
+    which is feasible for small graphs or graphs with a small treewidth.
+
+    Parameters
+    ----------
+    G : nx.Graph
+        The complete graph, whose node ids should be 0, 1, ..., n-1.
+    J : array
+        The coupling constants array with a shape of [..., n, n].
+    h : array
+        The field array with a shape of [..., n].
+    beta : float
+        The inverse temperature beta.
+    method : str
+        The method of elimination_order, "min_fill" or "min_degree".
+    max_intermediate_size : int, optional
+        The maximum number of elements of an intermediate tensor (for a single realization of J and h).
+
+    Returns
+    -------
+    marginals : array
+        The marginals array with a shape of [..., 2, n], marginals[..., :, i] = P_i.
+    """
+    edge_tensors, vertex_tensors = ising_tensors(J, h, beta, list(G.edges()))
+    return exact_tensor_marginals(G, edge_tensors, vertex_tensors, method, max_intermediate_size)
+
+
+
+def exact_tensor_marginals(G, edge_tensors, vertex_tensors, method="min_fill", max_intermediate_size=None):
+    """Calculate the exact marginal of every vertex of a tensor network with user-supplied tensors of an arbitrary bond dimension q
+    by contracting the tensor network of the whole graph G with variable elimination.
+
+    The elimination order is computed once on G and shared by all the marginals. If max_intermediate_size is given, the bonds selected by
+    slicing_bonds are sliced and the contraction results of all the slices are summed up.
+
+    Parameters
+    ----------
+    G : nx.Graph
+        The complete graph, whose node ids should be 0, 1, ..., n-1.
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the tensor on the edge (i, j) with a shape of [..., q, q], see tensor_contraction.
+    vertex_tensors : array
+        The vertex tensors array with a shape of [..., n, q].
+    method : str
+        The method of elimination_order, "min_fill" or "min_degree".
+    max_intermediate_size : int, optional
+        The maximum number of elements of an intermediate tensor (for a single realization of the tensors), which should not be smaller than q.
+
+    Returns
+    -------
+    marginals : array
+        The marginals array with a shape of [..., q, n], marginals[..., :, i] = P_i.
+    """
+    vertex_tensors = np.asarray(vertex_tensors)
+    n, q = vertex_tensors.shape[-2:]
+    batch_shape = tensors_batch_shape(edge_tensors, vertex_tensors)
+    if max_intermediate_size is not None and max_intermediate_size < q:
+        raise ValueError("max_intermediate_size must be at least the bond dimension {}.".format(q))
+    if max_intermediate_size is None:
+        sliced_bonds = []
+        order, _ = elimination_order(G, None, method)
+    else:
+        # the open bond stays in the intermediate tensors when the other bonds are eliminated in the same order
+        sliced_bonds, order = slicing_bonds(G, None, max(max_intermediate_size // q, 1), q, method)
+    edges = list(G.edges())
+    ixs = [list(edge) for edge in edges] + [[node] for node in range(n)]
+    tensors = oriented_edge_tensors(edge_tensors, edges)
+    for node in range(n):
+        tensors.append(vertex_tensors[..., node, :])
+
+    marginals = np.zeros(shape=batch_shape + (q, n))
+    for node in range(n):
+        node_order = [bond for bond in order if bond != node]
+        results = []
+        for assignment, sliced_ixs, sliced_tensors in tensor_slices(ixs, tensors, sliced_bonds, q):
+            if node in assignment:
+                result, log_scale = elimination_contraction(sliced_ixs, sliced_tensors, node_order, [])
+                result = result[..., None] * np.eye(q)[assignment[node]]
+            else:
+                result, log_scale = elimination_contraction(sliced_ixs, sliced_tensors, node_order, [node])
+            results.append((result, log_scale))
+        z = slices_sum(results)
+        marginals[..., :, node] = z / z.sum(axis=-1, keepdims=True)
+    return marginals
+
+
+
+def exact_marginals_save(file, marginals):
+    """Save the marginals in the csv format of "/constants/494bus_random_exact.csv",
+    whose i-th line is "P_i(s_i = 1) , P_i(s_i = -1)" for Ising spins and "P_i(s_i = 0) , ... , P_i(s_i = q-1)" for q-state spins.
+
+    Parameters
+    ----------
+    file : str
+        The path of the csv file.
+    marginals : array
+        The marginals array with a shape of [q, n].
+    """
+    with open(file, "w") as f:
+        for node in range(marginals.shape[-1]):
+            f.write(" , ".join(str(float(p)) for p in marginals[:, node]) + "\n")
+
+
+
+def exact_marginals_load(file):
+    """Load the marginals saved by exact_marginals_save (or any reference file in the same format).
+
+    Parameters
+    ----------
+    file : str
+        The path of the csv file.
+
+    Returns
+    -------
+    marginals : array
+        The marginals array with a shape of [q, n].
+    """
+    data_exact = np.loadtxt(open(file, "rb"), delimiter=",", ndmin=2)
+    return data_exact.T.copy()
+
+
+
+def marginals_error(marginals, marginals_exact):
+    """Calculate the error of the marginals with respect to the exact marginals, ||P(s_i = 1) - P_exact(s_i = 1)||_2 / n, as in the tutorial.
+
+    Parameters
+    ----------
+    marginals : array
+        The marginals array with a shape of [..., 2, n].
+    marginals_exact : array
+        The exact marginals array with a shape of [..., 2, n].
+
+    Returns
+    -------
+    error : array
+        The error with a shape of [...].
+    """
+    n = marginals.shape[-1]
+    return np.sum((marginals[..., 0, :] - marginals_exact[..., 0, :])**2, axis=-1)**0.5/n
@@ -1,7 +1,55 @@
+from collections import OrderedDict
 import networkx as nx
 
+LAYOUTS = OrderedDict()
+LAYOUT_CACHE_SIZE = 64
 
-def tensor_network_map(G_sub, G_focus, G, center_node, open):
+
+def edge_index(G):
+    """Index the edges of G in both orientations.
+
+    Parameters
+    ----------
+    G : nx.Graph
+
+    Returns
+    -------
+    edge_ids : dict[tuple of int,int]
+        edge_ids[(i, j)] = edge_ids[(j, i)] = the position of the edge (i, j) in list(G.edges()).
+    """
+    edge_ids = {}
+    for edge_id, edge in enumerate(G.edges()):
+        edge_ids[edge] = edge_id
+        edge_ids[(edge[1], edge[0])] = edge_id
+    return edge_ids
+
+
+
+def layout(G):
+    """Compute the Kamada-Kawai layout of G, which is cached for every graph with the same nodes and edges in the same order.
+    Only the LAYOUT_CACHE_SIZE most recently used layouts are kept.
+
+    Parameters
+    ----------
+    G : nx.Graph
+
+    Returns
+    -------
+    position : dict[int,array]
+        The positions of the nodes in the figure, which is a copy that can be modified without affecting the cache.
+    """
+    key = (tuple(G.nodes()), tuple(G.edges()))
+    if key in LAYOUTS:
+        LAYOUTS.move_to_end(key)
+    else:
+        LAYOUTS[key] = nx.kamada_kawai_layout(G)
+        if len(LAYOUTS) > LAYOUT_CACHE_SIZE:
+            LAYOUTS.popitem(last=False)
+    position = {node: pos.copy() for node, pos in LAYOUTS[key].items()}
+    return position
+
+
+def tensor_network_map(G_sub, G_focus, G, center_node, open, position=True):
     """Map G_sub and part of the environment graph which is adjacent to it to the corresponding tensor network in graph format.
 
     Parameters
@@ -16,6 +64,8 @@ def tensor_network_map(G_sub, G_focus, G, center_node, open):
         The center node is always an internal bond regardless of whether it has edges connected to vertices outside of G_sub.
     open : Bool
         True if there is an open leg on the center node and otherwise False.
+    position : Bool
+        True if the positions of the nodes are computed and otherwise False, e.g. when only the structure of the tensor network is needed.
 
     Returns
     -------
@@ -24,6 +74,7 @@ def tensor_network_map(G_sub, G_focus, G, center_node, open):
     position_T : dict[int,array]
         The positions of the nodes in the figure. 
         The key is the node id and the value is its position, which is an array with a shape of [2] corresponding to x and y coordinates.
+        None if position is False.
     square_nodes_focus : list of int
         The node ids of the Boltzmann matrices in the corresponding tensor network of G_focus.
     square_nodes_neighborhood : list of int
@@ -47,11 +98,9 @@ def tensor_network_map(G_sub, G_focus, G, center_node, open):
     n = G.number_of_nodes()
     square_nodes_focus = []
     square_nodes_neighborhood = []
+    edge_ids = edge_index(G)
     for edge in list(G_focus.edges()):
-        if edge in list(G.edges()):
-            J_id = 10*n + list(G.edges()).index(edge)
-        else:
-            J_id = 10*n + list(G.edges()).index((edge[1], edge[0]))
+        J_id = 10*n + edge_ids[edge]
         G_tn.add_edge(J_id, edge[0])
         G_tn.add_edge(J_id, edge[1])
         square_nodes_focus.append(J_id)
@@ -90,7 +139,7 @@ def tensor_network_map(G_sub, G_focus, G, center_node, open):
         G_tn.add_edge(open_id, center_node)
     else:
         open_id = False
-    position_T = nx.kamada_kawai_layout(G_tn)
+    position_T = layout(G_tn) if position else None
 
     return G_tn,position_T,square_nodes_focus,square_nodes_neighborhood,boundary_bonds,boundary_nodes,internal_bonds,internal_nodes,environment_bonds,environment_nodes,open_id
 
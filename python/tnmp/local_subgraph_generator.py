@@ -1,6 +1,5 @@
 from copy import deepcopy
 import networkx as nx
-import matplotlib.pyplot as plt
 
 def Ni_generator(G,center_node,R):
     """Generate the subgraph G_neighborhood(R) of the center node on the corresponding graph G, 
@@ -0,0 +1,475 @@
+import itertools
+import numpy as np
+from .contraction_order import elimination_order, slicing_bonds
+
+ALLOW_ACSII = list(range(65, 90)) + list(range(97, 122))
+LETTES = [chr(ALLOW_ACSII[i]) for i in range(len(ALLOW_ACSII))]
+
+
+def einsum_eq_convert(ixs, iy, batch=False):
+    """Generate a einqum eq according to ixs (bonds of contraction tensors) and iy (bonds of resulting tensors)
+    
+    Parameters
+    ----------
+    ixs : list of list 
+        The list of bonds of contraction tensors, ixs[i][i_k] = the node_id of the i_k-th bond of the i-th tensor in the contraction sequence.
+    iy: list
+        The list of the corresponding node_ids of open_bonds.
+    batch : Bool
+        True if every tensor carries leading sample axes, which are marked by a leading '...' on every term, and otherwise False.
+    
+    Returns
+    -------
+    einsum_eq :  str
+        The corresponding einsum equation of the contraction, for example, 'ab,b->a' corresponds to the multiplication of a matrix and a vector.
+    """
+    uniquelabels = list(set(sum(ixs, start=[]) + iy))
+    labelmap = {l:LETTES[i] for i, l in enumerate(uniquelabels)}
+    prefix = "..." if batch else ""
+    einsum_eq = ",".join([prefix + "".join([labelmap[l] for l in ix]) for ix in ixs]) + \
+          "->" + prefix + "".join([labelmap[l] for l in iy])
+    return einsum_eq
+
+
+
+def contraction_plan(G_local, open_bond, method="greedy", max_intermediate_size=None, bond_dimension=2):
+    """Build the contraction plan of the local tensor network defined on G_local, which only depends on the structure of G_local and 
+    can therefore be reused in every iteration step and for every realization of J and h.
+
+    Parameters
+    ----------
+    G_local : nx.Graph
+        The corresponding subgraph of the local tensor network to be contracted.
+    open_bond : int
+        The node_id of the open bond in the local tensor network.
+    method : str
+        "greedy" for a single einsum following the contraction path found by np.einsum_path,
+        "min_fill" or "min_degree" for eliminating the bonds one by one in the elimination order computed on G_local with elimination_contraction,
+        which has no limit on the number of bonds of G_local.
+    max_intermediate_size : int, optional
+        The maximum number of elements of an intermediate tensor (for a single realization of J and h), 
+        which is enforced by slicing over selected bonds and only available for the elimination orders. It should not be smaller than bond_dimension.
+    bond_dimension : int
+        The dimension q of every bond, 2 for Ising spins.
+
+    Returns
+    -------
+    plan : tuple
+        (edges, bonds, einsum_eq, path, sliced_bonds), where edges = list(G_local.edges()) and bonds = list(G_local.nodes()) give the order of the tensors
+        and sliced_bonds is the list of the sliced bonds. For "greedy", einsum_eq is the einsum equation with a leading '...' on every tensor for the sample axis
+        and path is its contraction path. For the elimination orders, einsum_eq is None and path is the elimination order of the bonds of a single slice.
+    """
+    edges = list(G_local.edges())
+    bonds = list(G_local.nodes())
+    sliced_bonds = []
+    if method == "greedy" and max_intermediate_size is not None:
+        raise ValueError("Slicing requires an elimination order, use method='min_fill' or 'min_degree'.")
+    if max_intermediate_size is not None and max_intermediate_size < bond_dimension:
+        raise ValueError("max_intermediate_size must be at least the bond dimension {}.".format(bond_dimension))
+    if method == "greedy":
+        einsum_eq = einsum_eq_convert([list(edge) for edge in edges] + [[bond] for bond in bonds], [open_bond], batch=True)
+        operands = [np.ones([bond_dimension, bond_dimension])] * len(edges) + [np.ones([bond_dimension])] * len(bonds)
+        path, _ = np.einsum_path(einsum_eq, *operands, optimize="greedy")
+    else:
+        einsum_eq = None
+        if max_intermediate_size is None:
+            path, _ = elimination_order(G_local, open_bond, method)
+        else:
+            sliced_bonds, path = slicing_bonds(G_local, open_bond, max_intermediate_size, bond_dimension, method)
+    plan = (edges, bonds, einsum_eq, path, sliced_bonds)
+    return plan
+
+
+
+def tensor_slices(ixs, tensors, sliced_bonds, bond_dimension):
+    """Generate every slice of a tensor network, whose contraction results sum up to the contraction result of the network.
+    The slices are independent of each other, so they can also be distributed to several workers.
+
+    Parameters
+    ----------
+    ixs : list of list
+        The list of bonds of contraction tensors, ixs[i][i_k] = the node_id of the i_k-th bond of the i-th tensor.
+    tensors : list of array
+        The tensors of the network, tensors[i] has a shape of [..., q, ..., q] with len(ixs[i]) trailing bond axes.
+    sliced_bonds : list of int
+        The node_ids of the sliced bonds.
+    bond_dimension : int
+        The dimension q of every bond.
+
+    Yields
+    ------
+    assignment : dict[int,int]
+        assignment[bond] = the value of the sliced bond in the slice.
+    sliced_ixs : list of list
+        The bonds of the sliced tensors, without the sliced bonds.
+    sliced_tensors : list of array
+        The tensors of the slice, in which every sliced bond is fixed to its value.
+    """
+    for values in itertools.product(range(bond_dimension), repeat=len(sliced_bonds)):
+        assignment = dict(zip(sliced_bonds, values))
+        sliced_ixs = [[bond for bond in ix if bond not in assignment] for ix in ixs]
+        sliced_tensors = [tensor[(Ellipsis,) + tuple(assignment.get(bond, slice(None)) for bond in ix)] for ix, tensor in zip(ixs, tensors)]
+        yield assignment, sliced_ixs, sliced_tensors
+
+
+
+def oriented_edge_tensors(edge_tensors, edges):
+    """Look up the tensors on edges, where a tensor given for the reversed edge (j, i) is transposed.
+
+    Parameters
+    ----------
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the tensor on the edge (i, j) with a shape of [..., q, q], whose last two axes correspond to the bonds i and j.
+    edges : list of tuple of int
+        The edges in the order of the tensor network.
+
+    Returns
+    -------
+    tensors : list of array
+        tensors[k] = the tensor on edges[k], whose last two axes correspond to the bonds edges[k][0] and edges[k][1].
+    """
+    tensors = []
+    for edge in edges:
+        if edge in edge_tensors:
+            tensors.append(edge_tensors[edge])
+        else:
+            tensors.append(np.swapaxes(edge_tensors[(edge[1], edge[0])], -2, -1))
+    return tensors
+
+
+
+def local_contraction(G_local,J,h,cavity,open_bond,beta,plan=None):
+    """Contract the local tensor network defined on G_local into a vector with the open_bond.
+    
+    All the model arrays may carry the same leading sample axes, e.g. J with a shape of [S, n, n], h with a shape of [S, n] and cavity with a shape of [S, n, n, 2] 
+    for S realizations of the couplings and fields on the same graph, in which case all the realizations are contracted in a single einsum.
+
+    Parameters
+    ----------
+    G_local : nx.Graph
+        The corresponding subgraph of the local tensor network to be contracted.
+    J : array
+        The coupling constants array with a shape of [..., n, n], J[i][j] = J_ij for every edge (i, j) of G and in all other positions of J are filled with 0.
+    h : array
+        The field array with a shape of [..., n] and h[i] = h_i.
+    cavity : array
+        The message vectors array with a shape of [..., n, n, 2], 
+        cavity[a][i] = m_{a → i} when a is a boundary node of G_N_i 
+                 and = np.exp(beta * h_a * np.array([1, -1])) otherwise.
+    open_bond : int
+        The node_id of the open bond in the local tensor network.
+    beta : float
+        The inverse temperature beta.
+    plan : tuple, optional
+        The contraction plan of G_local generated by contraction_plan(G_local, open_bond), which is built here if not given.
+
+    Returns
+    -------
+    result_vector :  array
+        Our algorithm only needs to calculate the case where the local tensor network contains only one open bond, 
+        so the result is always a vector, with a shape of [..., 2].
+    """
+    if plan is None:
+        plan = contraction_plan(G_local, open_bond)
+    edge_tensors, vertex_tensors = ising_tensors(J, h, beta, plan[0])
+    return tensor_contraction(G_local, edge_tensors, vertex_tensors, cavity, open_bond, plan)
+
+
+
+def tensor_contraction(G_local, edge_tensors, vertex_tensors, cavity, open_bond, plan=None):
+    """Contract the local tensor network defined on G_local with user-supplied tensors of an arbitrary bond dimension q into a vector with the open_bond,
+    e.g. for Potts models or general factor graphs.
+
+    Parameters
+    ----------
+    G_local : nx.Graph
+        The corresponding subgraph of the local tensor network to be contracted.
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the tensor on the edge (i, j) with a shape of [..., q, q], whose last two axes correspond to the bonds i and j.
+        Only one of (i, j) and (j, i) is needed.
+    vertex_tensors : array
+        The vertex tensors array with a shape of [..., n, q], vertex_tensors[i] = the tensor attached to the bond i.
+    cavity : array
+        The message vectors array with a shape of [..., n, n, q].
+    open_bond : int
+        The node_id of the open bond in the local tensor network.
+    plan : tuple, optional
+        The contraction plan of G_local generated by contraction_plan(G_local, open_bond, bond_dimension=q), which is built here if not given.
+
+    Returns
+    -------
+    result_vector :  array
+        The normalized result vector with a shape of [..., q].
+    """
+    if plan is None:
+        plan = contraction_plan(G_local, open_bond, bond_dimension=vertex_tensors.shape[-1])
+    edges, bonds, _, _, _ = plan
+    tensors = oriented_edge_tensors(edge_tensors, edges)
+    for bond in bonds:
+        if bond == open_bond:
+            tensor = vertex_tensors[..., bond, :]
+        else:
+            tensor = cavity[..., bond, open_bond, :]
+        tensor = tensor/np.linalg.norm(tensor, axis=-1, keepdims=True)
+        tensors.append(tensor)
+    return plan_contraction(plan, tensors, open_bond)
+
+
+
+def plan_contraction(plan, tensors, open_bond):
+    """Contract the tensors of a local tensor network following its contraction plan, summing up all the slices if there are sliced bonds.
+
+    Parameters
+    ----------
+    plan : tuple
+        The contraction plan generated by contraction_plan.
+    tensors : list of array
+        The tensors of the local tensor network in the order given by the plan.
+    open_bond : int
+        The node_id of the open bond in the local tensor network.
+
+    Returns
+    -------
+    result_vector :  array
+        The normalized result vector with a shape of [..., q].
+    """
+    edges, bonds, einsum_eq, path, sliced_bonds = plan
+    if einsum_eq is not None:
+        z = np.einsum(einsum_eq, *tensors, optimize=path)
+    else:
+        ixs = [list(edge) for edge in edges] + [[bond] for bond in bonds]
+        results = [elimination_contraction(sliced_ixs, sliced_tensors, path, [open_bond])
+                   for _, sliced_ixs, sliced_tensors in tensor_slices(ixs, tensors, sliced_bonds, tensors[-1].shape[-1])]
+        z = slices_sum(results)
+    result_vector = z / z.sum(axis=-1, keepdims=True)
+    return result_vector
+
+
+
+def tensors_batch_shape(edge_tensors, vertex_tensors):
+    """The shape of the leading sample axes shared by the edge tensors and vertex tensors, which may carry them separately,
+    e.g. for an ensemble of random couplings with a common field.
+
+    Parameters
+    ----------
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the tensor on the edge (i, j) with a shape of [..., q, q].
+    vertex_tensors : array
+        The vertex tensors array with a shape of [..., n, q].
+
+    Returns
+    -------
+    batch_shape : tuple of int
+        The broadcast shape of the leading sample axes of all the tensors.
+    """
+    return np.broadcast_shapes(np.shape(vertex_tensors)[:-2], *[np.shape(tensor)[:-2] for tensor in edge_tensors.values()])
+
+
+
+def ising_tensors(J, h, beta, edges):
+    """Build the normalized Boltzmann matrices and field vectors of the Ising model with the energy function E(s) = -sum J_ij s_i s_j - sum h_i s_i,
+    where the first and the second component of every bond correspond to s = 1 and s = -1, as in local_contraction.
+
+    Parameters
+    ----------
+    J : array
+        The coupling constants array with a shape of [..., n, n].
+    h : array
+        The field array with a shape of [..., n].
+    beta : float
+        The inverse temperature beta.
+    edges : list of tuple of int
+        The edges whose Boltzmann matrices are built.
+
+    Returns
+    -------
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the Boltzmann matrix on the edge (i, j) with a shape of [..., 2, 2].
+    vertex_tensors : array
+        The field vectors array with a shape of [..., n, 2].
+    """
+    return boltzmann_tensors(J, h, beta, edges, np.array([[1, -1], [-1, 1]]), np.array([1, -1]))
+
+
+
+def potts_tensors(J, h, beta, edges, q):
+    """Build the normalized Boltzmann matrices and field vectors of the q-state Potts model with the energy function
+    E(s) = -sum J_ij delta(s_i, s_j) - sum h_i delta(s_i, 0).
+
+    Parameters
+    ----------
+    J : array
+        The coupling constants array with a shape of [..., n, n].
+    h : array
+        The field array with a shape of [..., n].
+    beta : float
+        The inverse temperature beta.
+    edges : list of tuple of int
+        The edges whose Boltzmann matrices are built.
+    q : int
+        The number of states of every spin.
+
+    Returns
+    -------
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the Boltzmann matrix on the edge (i, j) with a shape of [..., q, q].
+    vertex_tensors : array
+        The field vectors array with a shape of [..., n, q].
+    """
+    return boltzmann_tensors(J, h, beta, edges, np.eye(q), np.eye(q)[0])
+
+
+
+def boltzmann_tensors(J, h, beta, edges, coupling_matrix, field_vector):
+    """Build the normalized Boltzmann matrices np.exp(beta * J_ij * coupling_matrix) and field vectors np.exp(beta * h_i * field_vector)
+    of a model with pairwise couplings, where coupling_matrix[s_i, s_j] and field_vector[s_i] are the interactions of the states of the spins.
+
+    Parameters
+    ----------
+    J : array
+        The coupling constants array with a shape of [..., n, n].
+    h : array
+        The field array with a shape of [..., n].
+    beta : float
+        The inverse temperature beta.
+    edges : list of tuple of int
+        The edges whose Boltzmann matrices are built, of which only the first orientation is kept.
+    coupling_matrix : array
+        The coupling matrix with a shape of [q, q].
+    field_vector : array
+        The field vector with a shape of [q].
+
+    Returns
+    -------
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the Boltzmann matrix on the edge (i, j) with a shape of [..., q, q].
+    vertex_tensors : array
+        The field vectors array with a shape of [..., n, q].
+    """
+    J = np.asarray(J)
+    h = np.asarray(h)
+    edge_tensors = {}
+    for edge in edges:
+        if edge in edge_tensors or (edge[1], edge[0]) in edge_tensors:
+            continue
+        tensor = np.exp(J[..., edge[0], edge[1], None, None] * beta * coupling_matrix)
+        edge_tensors[edge] = tensor/np.linalg.norm(tensor, axis=(-2, -1), keepdims=True)
+    vertex_tensors = np.exp(beta * h[..., None] * field_vector)
+    vertex_tensors = vertex_tensors/np.linalg.norm(vertex_tensors, axis=-1, keepdims=True)
+    return edge_tensors, vertex_tensors
+
+
+
+def elimination_contraction(ixs, tensors, order, iy):
+    """Contract a tensor network of arbitrary size, e.g. the tensor network of the whole graph, by eliminating its bonds one by one in the given order.
+
+    Every elimination only contracts the tensors sharing the eliminated bond with a small einsum, so the number of bonds of the network is not limited
+    by the number of einsum labels, and every intermediate tensor is rescaled by its maximum to avoid overflow and underflow.
+
+    Parameters
+    ----------
+    ixs : list of list
+        The list of bonds of contraction tensors, ixs[i][i_k] = the node_id of the i_k-th bond of the i-th tensor.
+    tensors : list of array
+        The tensors of the network, tensors[i] has a shape of [..., q, ..., q] with len(ixs[i]) trailing bond axes.
+    order : list of int
+        The elimination order of all the bonds which are not in iy.
+    iy : list
+        The list of the node_ids of the open bonds.
+
+    Returns
+    -------
+    result : array
+        The contraction result with a shape of [..., q, ..., q] up to a factor of np.exp(log_scale), with len(iy) trailing bond axes.
+    log_scale : array
+        The logarithm of the scale factors with a shape of [...], which is -inf if the contraction result vanishes.
+    """
+    operands = {}
+    bond_operands = {}
+    # the scalar operands (e.g. the sliced vertex tensors) are multiplied into a single factor as soon as they appear
+    factor = np.ones(())
+    log_scale = 0
+    for operand_id, (ix, tensor) in enumerate(zip(ixs, tensors)):
+        if len(ix) == 0:
+            factor, factor_log_scale = tensor_rescale(factor * tensor, 0)
+            log_scale = log_scale + factor_log_scale
+            continue
+        operands[operand_id] = (list(ix), tensor)
+        for bond in ix:
+            bond_operands.setdefault(bond, set()).add(operand_id)
+    next_id = len(ixs)
+    for bond in order:
+        operand_ids = sorted(bond_operands.pop(bond, set()))
+        if len(operand_ids) == 0:
+            continue
+        contracted = [operands.pop(operand_id) for operand_id in operand_ids]
+        merged = []
+        for ix, _ in contracted:
+            for label in ix:
+                if label != bond and label not in merged:
+                    merged.append(label)
+        eq = einsum_eq_convert([ix for ix, _ in contracted], merged, batch=True)
+        tensor = np.einsum(eq, *[tensor for _, tensor in contracted], optimize=True)
+        if len(merged) == 0:
+            factor, factor_log_scale = tensor_rescale(factor * tensor, 0)
+            log_scale = log_scale + factor_log_scale
+            continue
+        tensor, tensor_log_scale = tensor_rescale(tensor, len(merged))
+        log_scale = log_scale + tensor_log_scale
+        for label in merged:
+            bond_operands[label] -= set(operand_ids)
+            bond_operands[label].add(next_id)
+        operands[next_id] = (merged, tensor)
+        next_id += 1
+    remaining = list(operands.values()) + [([], factor)]
+    eq = einsum_eq_convert([ix for ix, _ in remaining], iy, batch=True)
+    result = np.einsum(eq, *[tensor for _, tensor in remaining], optimize=True)
+    return result, log_scale
+
+
+
+def tensor_rescale(tensor, n_bonds):
+    """Rescale a tensor by the maximum of its absolute values over its bond axes.
+
+    Parameters
+    ----------
+    tensor : array
+        The tensor with a shape of [..., q, ..., q] with n_bonds trailing bond axes.
+    n_bonds : int
+        The number of bond axes of the tensor.
+
+    Returns
+    -------
+    tensor : array
+        The rescaled tensor, whose maximum absolute value is 1 unless it vanishes.
+    log_scale : array
+        The logarithm of the scale factor with a shape of [...], which is -inf if the tensor vanishes.
+    """
+    scale = np.abs(tensor).reshape(tensor.shape[:tensor.ndim-n_bonds] + (-1,)).max(axis=-1)
+    # a vanishing tensor (e.g. a slice violating a hard constraint) stays zero with a log_scale of -inf
+    nonzero = scale > 0
+    scale = np.where(nonzero, scale, 1)
+    tensor = tensor / scale.reshape(scale.shape + (1,) * n_bonds)
+    return tensor, np.where(nonzero, np.log(scale), -np.inf)
+
+
+
+def slices_sum(results):
+    """Sum up the contraction results of the slices of a tensor network given by elimination_contraction, relative to the largest scale factor.
+
+    Parameters
+    ----------
+    results : list of tuple
+        results[k] = (result, log_scale) of the k-th slice, where the result has a shape of [..., q] and the log_scale has a shape of [...].
+        The slices with a log_scale of -inf vanish and do not contribute.
+
+    Returns
+    -------
+    z : array
+        The sum of the contraction results up to a common factor, with a shape of [..., q].
+    """
+    log_scales = np.broadcast_arrays(*[np.asarray(log_scale, dtype=float) for _, log_scale in results])
+    max_log_scale = np.max(log_scales, axis=0)
+    max_log_scale = np.where(np.isfinite(max_log_scale), max_log_scale, 0)
+    z = sum(result * np.exp(log_scale - max_log_scale)[..., None] for result, log_scale in results)
+    return z
@@ -0,0 +1,360 @@
+import numpy as np
+import networkx as nx
+from .local_subgraph_generator import Ni_generator, cavity_subgraph_generator
+from .local_tensor_network_contraction import tensor_contraction, contraction_plan, ising_tensors, tensors_batch_shape
+from .checkpoint import checkpoint_save, checkpoint_load, neighborhoods_save, neighborhoods_load, graph_fingerprint, tensors_fingerprint
+
+
+def neighborhoods_generator(G, R, checkpoint_dir=None):
+    """Generate the neighborhood G_N_i(R) and its boundary for every vertex i of G.
+
+    Parameters
+    ----------
+    G : nx.Graph
+        The complete graph.
+    R : int
+    checkpoint_dir : str, optional
+        If given, the neighborhoods are loaded from checkpoint_dir when they have been saved there for the same G and R,
+        and otherwise generated and saved there.
+
+    Returns
+    -------
+    Nv : list of list of int
+        The list of the vertex lists of all the G_N, Nv[i] = list(V(G_N_i)).
+    Ne : list of list of tuple of int
+        The list of the edge lists of all the G_N, Ne[i] = list(E(G_N_i)).
+    boundaries : list of list of int
+        The list of the boundary node lists of all the G_N, boundaries[i] = boundary nodes list of G_N_i.
+    """
+    metadata = {"R": R, "graph": graph_fingerprint(G)}
+    if checkpoint_dir is not None:
+        neighborhoods = neighborhoods_load(checkpoint_dir, metadata)
+        if neighborhoods is not None:
+            return neighborhoods
+    Nv = []
+    Ne = []
+    boundaries = []
+    for i in range(G.number_of_nodes()):
+        Ni_v, Ni_e = Ni_generator(G, i, R)
+        Nv.append(Ni_v)
+        Ne.append(Ni_e)
+        G_neighborhood = nx.Graph()
+        G_neighborhood.add_edges_from(Ni_e)
+        boundary = []
+        for node in Ni_v:
+            for noden in G.neighbors(node):
+                if not G_neighborhood.has_edge(node, noden):
+                    boundary.append(node)
+                    break
+        boundaries.append(boundary)
+    if checkpoint_dir is not None:
+        neighborhoods_save(checkpoint_dir, Nv, Ne, boundaries, metadata)
+    return Nv, Ne, boundaries
+
+
+
+def plans_generator(Nv, Ne, boundaries, method="greedy", max_intermediate_size=None, bond_dimension=2):
+    """Generate the cavity sub-networks G_C_{a → i}, the neighborhoods G_N_i and their contraction plans,
+    which only depend on the graph and are shared by all the iteration steps, temperatures and realizations of J and h.
+
+    Parameters
+    ----------
+    Nv : list of list of int
+        The list of the vertex lists of all the G_N, Nv[i] = list(V(G_N_i)).
+    Ne : list of list of tuple of int
+        The list of the edge lists of all the G_N, Ne[i] = list(E(G_N_i)).
+    boundaries : list of list of int
+        The list of the boundary node lists of all the G_N, boundaries[i] = boundary nodes list of G_N_i.
+    method : str
+        The method of contraction_plan, "greedy", "min_fill" or "min_degree".
+    max_intermediate_size : int, optional
+        The maximum number of elements of an intermediate tensor of every contraction, see contraction_plan.
+    bond_dimension : int
+        The dimension q of every bond, 2 for Ising spins.
+
+    Returns
+    -------
+    cavity_plans : dict[tuple of int,tuple]
+        cavity_plans[(a, i)] = (G_C_{a → i}, plan of G_C_{a → i} with the open bond a) for every boundary node a of G_N_i.
+    neighborhood_plans : list of tuple
+        neighborhood_plans[i] = (G_N_i, plan of G_N_i with the open bond i).
+    """
+    cavity_plans = {}
+    neighborhood_plans = []
+    for center_node in range(len(Nv)):
+        for node in boundaries[center_node]:
+            G_cavity = cavity_subgraph_generator(Ne, node, center_node)
+            cavity_plans[(node, center_node)] = (G_cavity, contraction_plan(G_cavity, node, method, max_intermediate_size, bond_dimension))
+        G_neighborhood = nx.Graph()
+        G_neighborhood.add_edges_from(Ne[center_node])
+        neighborhood_plans.append((G_neighborhood, contraction_plan(G_neighborhood, center_node, method, max_intermediate_size, bond_dimension)))
+    return cavity_plans, neighborhood_plans
+
+
+
+def message_passing(J, h, Nv, boundaries, cavity_plans, beta, damping_factor=0, epsilon=1e-6, step_limit=10000, cavity=None, verbose=False,
+                    adaptive_damping=False, max_damping_factor=0.9, anderson_depth=0, checkpoint_dir=None, checkpoint_interval=100):
+    """Iterate the message vectors m_{a → i} of the Ising model until convergence by contracting the cavity sub-networks G_C_{a → i}.
+
+    J, h and cavity may carry leading sample axes (broadcast against each other, e.g. random J with a common h) for an ensemble of realizations of the couplings and fields on the same graph,
+    in which case every contraction processes all the realizations at once and the iteration stops when all of them have converged.
+
+    Parameters
+    ----------
+    J : array
+        The coupling constants array with a shape of [..., n, n].
+    h : array
+        The field array with a shape of [..., n].
+    Nv : list of list of int
+        The list of the vertex lists of all the G_N, Nv[i] = list(V(G_N_i)).
+    boundaries : list of list of int
+        The list of the boundary node lists of all the G_N, boundaries[i] = boundary nodes list of G_N_i.
+    cavity_plans : dict[tuple of int,tuple]
+        The cavity sub-networks and their contraction plans generated by plans_generator.
+    beta : float
+        The inverse temperature beta.
+    damping_factor, epsilon, step_limit, cavity, verbose, adaptive_damping, max_damping_factor, anderson_depth, checkpoint_dir, checkpoint_interval
+        See tensor_message_passing, where the message vectors have a shape of [..., n, n, 2].
+
+    Returns
+    -------
+    cavity : array
+        The message vectors array with a shape of [..., n, n, 2] at the end of the iteration.
+    step : int
+        The number of iteration steps performed.
+    differences : list of float
+        differences[t] = the maximum difference of the message vectors in the (t+1)-th step.
+    """
+    edges = [edge for _, plan in cavity_plans.values() for edge in plan[0]]
+    edge_tensors, vertex_tensors = ising_tensors(J, h, beta, edges)
+    return tensor_message_passing(edge_tensors, vertex_tensors, Nv, boundaries, cavity_plans, damping_factor, epsilon, step_limit, cavity, verbose,
+                                  adaptive_damping, max_damping_factor, anderson_depth, checkpoint_dir, checkpoint_interval, {"beta": beta})
+
+
+
+def tensor_message_passing(edge_tensors, vertex_tensors, Nv, boundaries, cavity_plans, damping_factor=0, epsilon=1e-6, step_limit=10000,
+                           cavity=None, verbose=False, adaptive_damping=False, max_damping_factor=0.9, anderson_depth=0, checkpoint_dir=None, checkpoint_interval=100,
+                           checkpoint_metadata=None):
+    """Iterate the message vectors m_{a → i} of a tensor network with user-supplied edge tensors and vertex tensors of an arbitrary bond dimension q
+    (e.g. Potts models or factor graphs) until convergence by contracting the cavity sub-networks G_C_{a → i}.
+
+    The tensors and cavity may carry leading sample axes (broadcast against each other) for an ensemble of realizations of the model on the same graph,
+    in which case every contraction processes all the realizations at once and the iteration stops when all of them have converged.
+
+    Parameters
+    ----------
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the tensor on the edge (i, j) with a shape of [..., q, q], see tensor_contraction.
+    vertex_tensors : array
+        The vertex tensors array with a shape of [..., n, q].
+    Nv : list of list of int
+        The list of the vertex lists of all the G_N, Nv[i] = list(V(G_N_i)).
+    boundaries : list of list of int
+        The list of the boundary node lists of all the G_N, boundaries[i] = boundary nodes list of G_N_i.
+    cavity_plans : dict[tuple of int,tuple]
+        The cavity sub-networks and their contraction plans generated by plans_generator with bond_dimension=q.
+    damping_factor : float
+        m_{a → i}(t) = damping_factor * m_{a → i}(t-1) + (1 - damping_factor) * (the contraction result of G_C_{a → i}).
+    epsilon : float
+        The iteration stops when the maximum difference of the message vectors between two steps is not larger than epsilon.
+        With adaptive_damping, the difference is the undamped change of the message vectors, which does not depend on their damping factors.
+    step_limit : int
+        The maximum number of iteration steps.
+    cavity : array, optional
+        The initial message vectors array with a shape of [..., n, n, q], which is filled with 1/q if not given.
+    verbose : Bool
+        True if the maximum difference is printed at every iteration step and otherwise False.
+    adaptive_damping : Bool
+        True if every message vector has its own damping factor, which is raised towards max_damping_factor whenever the update of the message 
+        changes direction between two steps without shrinking by half (an oscillation) and relaxed back towards damping_factor otherwise.
+    max_damping_factor : float
+        The upper limit of the adaptive damping factors.
+    anderson_depth : int
+        The number of previous steps used in the Anderson extrapolation of the flattened message vector at the end of each step, 0 for plain iteration.
+    checkpoint_dir : str, optional
+        If given, the message vectors, the step counter and the differences are saved to checkpoint_dir every checkpoint_interval steps 
+        and at the end of the iteration, and an existing checkpoint in checkpoint_dir is resumed instead of the initial cavity.
+        The adaptive damping factors and the Anderson history are not saved and restart from scratch when resuming.
+        A ValueError is raised if the existing checkpoint was saved for other tensors or another shape of the message vectors.
+    checkpoint_interval : int
+        The number of iteration steps between two checkpoints.
+    checkpoint_metadata : dict, optional
+        Additional parameters of the run saved with the checkpoint and checked when resuming, e.g. {"beta": beta}.
+
+    Returns
+    -------
+    cavity : array
+        The message vectors array with a shape of [..., n, n, q] at the end of the iteration.
+    step : int
+        The number of iteration steps performed.
+    differences : list of float
+        differences[t] = the maximum difference of the message vectors in the (t+1)-th step.
+    """
+    vertex_tensors = np.asarray(vertex_tensors)
+    n, q = vertex_tensors.shape[-2:]
+    shape = tensors_batch_shape(edge_tensors, vertex_tensors) + (n, n, q)
+    start_step = 0
+    differences = []
+    if checkpoint_dir is not None:
+        metadata = dict(checkpoint_metadata or {}, shape=list(shape), tensors=tensors_fingerprint(edge_tensors, vertex_tensors))
+        checkpoint = checkpoint_load(checkpoint_dir, mmap_mode="c", metadata=metadata)
+        if checkpoint is not None:
+            cavity, start_step, differences = checkpoint
+            if len(differences) != 0 and differences[-1] <= epsilon:
+                return cavity, start_step, differences
+    if cavity is None:
+        cavity = np.ones(shape=shape) / q
+    field = vertex_tensors/np.linalg.norm(vertex_tensors, axis=-1, keepdims=True)
+    for center_node in range(n):
+        boundary = set(boundaries[center_node])
+        for node in Nv[center_node]:
+            if node not in boundary:
+                cavity[..., node, center_node, :] = field[..., node, :]
+    if adaptive_damping:
+        damping_factors = np.full(cavity.shape[:-1], float(damping_factor))
+        last_updates = np.zeros(cavity.shape)
+    if anderson_depth > 0:
+        message_ids = np.array([(node, center_node) for center_node in range(n) for node in boundaries[center_node]], dtype=int).reshape(-1, 2)
+        iterates = []
+        residuals = []
+    step = start_step
+    for step in range(start_step + 1, step_limit + 1):
+        if anderson_depth > 0:
+            messages_old = cavity[..., message_ids[:, 0], message_ids[:, 1], :].copy()
+        difference_max = 0
+        for center_node in range(n):
+            for node in boundaries[center_node]:
+                G_cavity, plan = cavity_plans[(node, center_node)]
+                new_cavity_vector = tensor_contraction(G_cavity, edge_tensors, vertex_tensors, cavity, node, plan)
+                if adaptive_damping:
+                    update = new_cavity_vector/np.linalg.norm(new_cavity_vector, axis=-1, keepdims=True) - cavity[..., node, center_node, :]
+                    last_update = last_updates[..., node, center_node, :]
+                    oscillation = ((update * last_update).sum(axis=-1) < 0) & \
+                                  (np.linalg.norm(update, axis=-1) > 0.5 * np.linalg.norm(last_update, axis=-1))
+                    damping = damping_factors[..., node, center_node]
+                    damping = np.where(oscillation, damping + 0.5 * (max_damping_factor - damping), damping_factor + 0.5 * (damping - damping_factor))
+                    damping_factors[..., node, center_node] = damping
+                    last_updates[..., node, center_node, :] = update
+                    damping = damping[..., None]
+                else:
+                    damping = damping_factor
+                temp = damping * cavity[..., node, center_node, :] + (1 - damping) * new_cavity_vector
+                temp /= np.linalg.norm(temp, axis=-1, keepdims=True)
+                if adaptive_damping:
+                    # the damped change of a strongly damped message understates how far it is from the fixed point
+                    difference = np.abs(update).max()
+                else:
+                    difference = np.abs(temp - cavity[..., node, center_node, :]).max()
+                cavity[..., node, center_node, :] = temp
+                if difference > difference_max:
+                    difference_max = difference
+        differences.append(float(difference_max))
+        if verbose:
+            print("iteration step:", step, ",  difference:", float(difference_max))
+        if checkpoint_dir is not None and step % checkpoint_interval == 0:
+            checkpoint_save(checkpoint_dir, cavity, step, differences, metadata)
+        if difference_max <= epsilon:
+            break
+        if anderson_depth > 0 and len(message_ids) > 0:
+            messages = cavity[..., message_ids[:, 0], message_ids[:, 1], :]
+            iterates.append(messages.reshape(messages.shape[:-2] + (-1,)))
+            residuals.append((messages - messages_old).reshape(messages.shape[:-2] + (-1,)))
+            if len(iterates) > anderson_depth + 1:
+                iterates.pop(0)
+                residuals.pop(0)
+            if len(iterates) > 1:
+                messages_new = anderson_extrapolation(iterates, residuals).reshape(messages.shape)
+                messages_new /= np.linalg.norm(messages_new, axis=-1, keepdims=True)
+                messages_new = np.where((messages_new > 0).all(axis=-1, keepdims=True), messages_new, messages)
+                cavity[..., message_ids[:, 0], message_ids[:, 1], :] = messages_new
+    if checkpoint_dir is not None:
+        checkpoint_save(checkpoint_dir, cavity, step, differences, metadata)
+    return cavity, step, differences
+
+
+
+def anderson_extrapolation(iterates, residuals, regularization=1e-10):
+    """Extrapolate the fixed point of the iteration from the latest steps by Anderson mixing (equivalent to DIIS), 
+    which combines the latest iterates with the coefficients minimizing the norm of the combined residual.
+
+    Parameters
+    ----------
+    iterates : list of array
+        iterates[k] = the flattened message vector after the k-th step, with a shape of [..., L].
+    residuals : list of array
+        residuals[k] = the change of the flattened message vector in the k-th step, with a shape of [..., L].
+    regularization : float
+        The Tikhonov regularization of the least square problem for the mixing coefficients.
+
+    Returns
+    -------
+    extrapolation : array
+        The extrapolated flattened message vector with a shape of [..., L].
+    """
+    delta_iterates = np.stack([iterates[k+1] - iterates[k] for k in range(len(iterates)-1)], axis=-1)
+    delta_residuals = np.stack([residuals[k+1] - residuals[k] for k in range(len(residuals)-1)], axis=-1)
+    gram = np.einsum('...lk,...lm->...km', delta_residuals, delta_residuals)
+    scale = np.trace(gram, axis1=-2, axis2=-1)[..., None, None] + 1e-300
+    gram = gram + regularization * scale * np.eye(gram.shape[-1])
+    rhs = np.einsum('...lk,...l->...k', delta_residuals, residuals[-1])
+    gamma = np.linalg.solve(gram, rhs[..., None])[..., 0]
+    extrapolation = iterates[-1] - np.einsum('...lk,...k->...l', delta_iterates, gamma)
+    return extrapolation
+
+
+
+def marginals_calculate(J, h, cavity, neighborhood_plans, beta):
+    """Contract the neighborhood G_N_i of the Ising model with the converged message vectors to calculate the marginal of each vertex i.
+
+    Parameters
+    ----------
+    J : array
+        The coupling constants array with a shape of [..., n, n].
+    h : array
+        The field array with a shape of [..., n].
+    cavity : array
+        The message vectors array with a shape of [..., n, n, 2].
+    neighborhood_plans : list of tuple
+        The neighborhoods and their contraction plans generated by plans_generator.
+    beta : float
+        The inverse temperature beta.
+
+    Returns
+    -------
+    marginals : array
+        The marginals array with a shape of [..., 2, n], marginals[..., :, i] = P_i.
+    """
+    edges = [edge for _, plan in neighborhood_plans for edge in plan[0]]
+    edge_tensors, vertex_tensors = ising_tensors(J, h, beta, edges)
+    return tensor_marginals_calculate(edge_tensors, vertex_tensors, cavity, neighborhood_plans)
+
+
+
+def tensor_marginals_calculate(edge_tensors, vertex_tensors, cavity, neighborhood_plans):
+    """Contract the neighborhood G_N_i of a tensor network with user-supplied tensors with the converged message vectors
+    to calculate the marginal of each vertex i.
+
+    Parameters
+    ----------
+    edge_tensors : dict[tuple of int,array]
+        edge_tensors[(i, j)] = the tensor on the edge (i, j) with a shape of [..., q, q], see tensor_contraction.
+    vertex_tensors : array
+        The vertex tensors array with a shape of [..., n, q].
+    cavity : array
+        The message vectors array with a shape of [..., n, n, q].
+    neighborhood_plans : list of tuple
+        The neighborhoods and their contraction plans generated by plans_generator with bond_dimension=q.
+
+    Returns
+    -------
+    marginals : array
+        The marginals array with a shape of [..., q, n], marginals[..., :, i] = P_i.
+    """
+    vertex_tensors = np.asarray(vertex_tensors)
+    n, q = vertex_tensors.shape[-2:]
+    batch_shape = np.broadcast_shapes(tensors_batch_shape(edge_tensors, vertex_tensors), np.shape(cavity)[:-3])
+    marginals = np.zeros(shape=batch_shape + (q, n))
+    for node in range(n):
+        G_neighborhood, plan = neighborhood_plans[node]
+        marginals[..., :, node] = tensor_contraction(G_neighborhood, edge_tensors, vertex_tensors, cavity, node, plan)
+    return marginals
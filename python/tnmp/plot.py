@@ -1,12 +1,8 @@
-from turtle import position
-import matplotlib.pyplot as plt
 import networkx as nx
 import numpy as np
-from local_subgraph_generator import cavity_subgraph_generator
-from graph_tensor_network_map import tensor_network_map
+from .local_subgraph_generator import cavity_subgraph_generator
+from .graph_tensor_network_map import tensor_network_map, edge_index
 from copy import deepcopy
-import seaborn as sns
-from IPython import display
 
 
 def get_layer_environment_node(G, layer, center_node):
@@ -124,32 +120,26 @@ def neighborhood_show(G_sub, G_focus, center_node, new_nodes, new_edges, boundar
         The coordinates in the entire figure when the drawn figure appears as a subfigure.
     """
     
+    node_ids = {node: node_id for node_id, node in enumerate(G_focus.nodes())}
+    edge_ids = edge_index(G_focus)
     node_color = ['k'] * len(G_focus.nodes())
     edge_color = ['k'] * len(G_focus.edges())
     node_sizes = [400] * len(G_focus.nodes())
-    node_sizes[list(G_focus.nodes()).index(center_node)] = 600
+    node_sizes[node_ids[center_node]] = 600
     node_shape = ['o'] * len(G_focus.nodes())
     for node in boundary:
-        node_shape[list(G_focus.nodes()).index(node)] = 'h'
+        node_shape[node_ids[node]] = 'h'
     for node in list(G_sub.nodes()):
-        index_node = list(G_focus.nodes()).index(node)
-        node_color[index_node] = 'g'
+        node_color[node_ids[node]] = 'g'
     for edge in list(G_sub.edges()):
-        if edge in list(G_focus.edges()):
-            index_edge = list(G_focus.edges()).index(edge)
-        else:
-            index_edge = list(G_focus.edges()).index((edge[1], edge[0]))
-        edge_color[index_edge] = 'g'
+        edge_color[edge_ids[edge]] = 'g'
     for node in new_nodes:
-        node_sizes[list(G_focus.nodes()).index(node)] = 800
-        node_color[list(G_focus.nodes()).index(node)] = 'orange'
-    node_color[list(G_focus.nodes()).index(center_node)] = 'r'
+        node_sizes[node_ids[node]] = 800
+        node_color[node_ids[node]] = 'orange'
+    node_color[node_ids[center_node]] = 'r'
     
     for edge in new_edges:
-        if edge in list(G_focus.edges()):
-            edge_color[list(G_focus.edges()).index(edge)] = 'orange'
-        else:
-            edge_color[list(G_focus.edges()).index((edge[1],edge[0]))] = 'orange'
+        edge_color[edge_ids[edge]] = 'orange'
     
     graph_draw(G_focus,position,node_sizes,3,3,'w',node_color,edge_color,node_shape,ax,title)
 
@@ -177,20 +167,17 @@ def cavity_show(G_sub, G_focus,  boundary_node, center_node, title, position, ax
         The coordinates in the entire figure when the drawn figure appears as a subfigure.
     """
     
+    node_ids = {node: node_id for node_id, node in enumerate(G_focus.nodes())}
+    edge_ids = edge_index(G_focus)
     node_color = ['k'] * len(G_focus.nodes())
     edge_color = ['k'] * len(G_focus.edges())
     for node in list(G_sub.nodes()):
-        index_node = list(G_focus.nodes()).index(node)
-        node_color[index_node] = 'g'
+        node_color[node_ids[node]] = 'g'
     for edge in list(G_sub.edges()):
-        if edge in list(G_focus.edges()):
-            index_edge = list(G_focus.edges()).index(edge)
-        else:
-            index_edge = list(G_focus.edges()).index((edge[1], edge[0]))
-        edge_color[index_edge] = 'g'
+        edge_color[edge_ids[edge]] = 'g'
     
-    node_color[list(G_focus.nodes()).index(center_node)] = 'r'
-    node_color[list(G_focus.nodes()).index(boundary_node)] = 'b'
+    node_color[node_ids[center_node]] = 'r'
+    node_color[node_ids[boundary_node]] = 'b'
     
     graph_draw(G_focus,position,[150]*G_focus.number_of_nodes(),3,3,'w',node_color,edge_color,['o']*G_focus.number_of_nodes(),ax,title)
     
@@ -220,7 +207,9 @@ def tensor_network_show(G_sub, G, G_focus, center_node, title, ax):
         The positions of the nodes in the figure. 
         The key is the node id and the value is its position, which is an array with a shape of [2] corresponding to x and y coordinates.
     """
-    G_tn,position_T,square_nodes_focus,square_nodes_neighborhood,boundary_bonds,boundary_nodes,internal_bonds,internal_nodes,environment_bonds,environment_nodes,open_id = tensor_network_map(G_sub, G_focus, G, center_node, open)
+    G_tn,position_T,square_nodes_focus,square_nodes_neighborhood,boundary_bonds,boundary_nodes,internal_bonds,internal_nodes,environment_bonds,environment_nodes,open_id = tensor_network_map(G_sub, G_focus, G, center_node, True)
+    node_ids = {node: node_id for node_id, node in enumerate(G_tn.nodes())}
+    edge_ids = edge_index(G_tn)
     node_size = 150
     node_color = ['gray'] * len(G_tn.nodes())
     edge_color = ['gray'] * len(G_tn.edges())
@@ -229,52 +218,33 @@ def tensor_network_show(G_sub, G, G_focus, center_node, title, ax):
     styles = ['dashed']* len(G_tn.edges())
 
     for node in square_nodes_focus:
-        node_shapes[list(G_tn.nodes()).index(node)] = 's'
+        node_shapes[node_ids[node]] = 's'
     for node in square_nodes_neighborhood:
-        node_color[list(G_tn.nodes()).index(node)] = 'green'
-        node_shapes[list(G_tn.nodes()).index(node)] = 's'
+        node_color[node_ids[node]] = 'green'
+        node_shapes[node_ids[node]] = 's'
     for boundary_bond in boundary_bonds:
-        node_color[list(G_tn.nodes()).index(boundary_bond)] = 'pink'
+        node_color[node_ids[boundary_bond]] = 'pink'
     for internal_bond in internal_bonds:
-        node_color[list(G_tn.nodes()).index(internal_bond)] = 'blue'
-    node_color[list(G_tn.nodes()).index(center_node)] = 'red'
+        node_color[node_ids[internal_bond]] = 'blue'
+    node_color[node_ids[center_node]] = 'red'
     for node in boundary_nodes:
-        node_color[list(G_tn.nodes()).index(node)] = 'purple'
-        node_shapes[list(G_tn.nodes()).index(node)] = 'd'
+        node_color[node_ids[node]] = 'purple'
+        node_shapes[node_ids[node]] = 'd'
     for node in internal_nodes:
-        node_color[list(G_tn.nodes()).index(node)] = 'orange'
-        node_shapes[list(G_tn.nodes()).index(node)] = 'h'
+        node_color[node_ids[node]] = 'orange'
+        node_shapes[node_ids[node]] = 'h'
     for node in environment_nodes:
-        node_shapes[list(G_tn.nodes()).index(node)] = 'h'
-    if (open_id, center_node) in list(G_tn.edges()):
-        edge_color[list(G_tn.edges()).index((open_id, center_node))] = 'red'
-        styles[list(G_tn.edges()).index((open_id, center_node))] = 'solid'
-    else:
-        edge_color[list(G_tn.edges()).index((center_node, open_id))] = 'red'
-        styles[list(G_tn.edges()).index((center_node, open_id))] = 'solid'
+        node_shapes[node_ids[node]] = 'h'
+    edge_color[edge_ids[(open_id, center_node)]] = 'red'
+    styles[edge_ids[(open_id, center_node)]] = 'solid'
+    neighborhood_nodes = set(internal_nodes+internal_bonds+boundary_nodes+boundary_bonds+square_nodes_neighborhood)
     for edge in list(G_tn.edges()):
-        if edge[0] in internal_nodes+internal_bonds+boundary_nodes+boundary_bonds+square_nodes_neighborhood and edge[1] in internal_nodes+internal_bonds+boundary_nodes+boundary_bonds+square_nodes_neighborhood:
-            if edge in list(G_tn.edges()):
-                styles[list(G_tn.edges()).index(edge)] = 'solid'
-                edge_color[list(G_tn.edges()).index(edge)] = 'k'
-            else:
-                styles[list(G_tn.edges()).index((edge[1],edge[0]))] = 'solid'
-                edge_color[list(G_tn.edges()).index(edge)] = 'k'
-    node_color[list(G_tn.nodes()).index(open_id)] = 'red'
-    node_size[list(G_tn.nodes()).index(open_id)] = 0
-    # plt.subplot(axs[1])
-    #plt.axis('off')
-    position_T = nx.kamada_kawai_layout(G_tn)
-    for node in list(G_tn.nodes()):
-        pos_node = {}
-        pos_node[node] = position_T[node]
-        nx.draw_networkx_nodes(
-            G_tn, pos=pos_node, nodelist=[node],
-            node_size=[node_size[list(G_tn.nodes()).index(node)]],
-            node_color='w',
-            edgecolors=[node_color[list(G_tn.nodes()).index(node)]],
-            node_shape=node_shapes[list(G_tn.nodes()).index(node)],
-            linewidths=3, ax=ax)
+        if edge[0] in neighborhood_nodes and edge[1] in neighborhood_nodes:
+            styles[edge_ids[edge]] = 'solid'
+            edge_color[edge_ids[edge]] = 'k'
+    node_color[node_ids[open_id]] = 'red'
+    node_size[node_ids[open_id]] = 0
+    nodes_draw(G_tn, position_T, node_size, 3, 'w', node_color, node_shapes, ax)
     nx.draw_networkx_edges(G_tn, pos=position_T, edge_color=edge_color, width=3, style=styles, ax=ax)
     
     ax.set_title(title, fontsize=30,pad=-30)
@@ -299,6 +269,9 @@ def process_animation_show(G, Ne, boundary_node, center_node, pause_time):
     pause_time : float
         The pause time for each frame.
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from IPython import display
     figsize = [16, 12]
     G0 = get_layer_environment_node(G, 1, center_node)
     G_focus = nx.Graph()
@@ -326,16 +299,18 @@ def process_animation_show(G, Ne, boundary_node, center_node, pause_time):
                 G_focus.add_edge(edge[0], edge[1])
     
     T_focus,position_T,square_nodes,_,boundary_bonds,boundary_nodes_focus,internal_bonds,internal_nodes,environment_bonds,environment_nodes,open_id = tensor_network_map(G_focus, G_focus, G, center_node,True)
-    T_cavity,_,_,_,_,boundary_nodes_cavity,_,_,_,_,_ = tensor_network_map(G_cavity, G_cavity, G, boundary_node ,False)
+    T_cavity,_,_,_,_,boundary_nodes_cavity,_,_,_,_,_ = tensor_network_map(G_cavity, G_cavity, G, boundary_node ,False, position=False)
     
     cavity_Ts = []
     boundaries_sub_cavity = []
     for bid in range(len(cavity_Gs)):
         G_sub_cavity = cavity_Gs[bid]
-        T_sub_cavity,_,_,_,_,boundary_sub_cavity,_,_,_,_,_ = tensor_network_map(G_sub_cavity, G_sub_cavity, G, boundary[bid], False)
+        T_sub_cavity,_,_,_,_,boundary_sub_cavity,_,_,_,_,_ = tensor_network_map(G_sub_cavity, G_sub_cavity, G, boundary[bid], False, position=False)
         cavity_Ts.append(T_sub_cavity)
         boundaries_sub_cavity.append(boundary_sub_cavity)
 
+    node_ids = {node: node_id for node_id, node in enumerate(T_focus.nodes())}
+    edge_ids = edge_index(T_focus)
     node_color = np.zeros(shape=(len(T_focus.nodes()), 3))
     node_shape = ['o'] * len(T_focus.nodes())
     node_size = [300] * len(T_focus.nodes())
@@ -343,27 +318,21 @@ def process_animation_show(G, Ne, boundary_node, center_node, pause_time):
     colors = sns.color_palette("hls", len(boundary)+1)
 
     for node in square_nodes:
-        node_shape[list(T_focus.nodes()).index(node)] = 's'
+        node_shape[node_ids[node]] = 's'
     for node in internal_nodes+environment_nodes:
-        node_shape[list(T_focus.nodes()).index(node)] = 'h'
+        node_shape[node_ids[node]] = 'h'
     for node in boundary_nodes_focus:
-        node_shape[list(T_focus.nodes()).index(node)] = 'd'
+        node_shape[node_ids[node]] = 'd'
 
-    node_size[list(T_focus.nodes()).index(open_id)] = 0
-    if (center_node,open_id) in list(T_focus.edges()):
-        edge_color[list(T_focus.edges()).index((center_node,open_id))] = np.array([1, 0, 0])
-    else:
-        edge_color[list(T_focus.edges()).index((open_id,center_node))] = np.array([1, 0, 0])
+    node_size[node_ids[open_id]] = 0
+    edge_color[edge_ids[(center_node,open_id)]] = np.array([1, 0, 0])
 
     for node in list(T_cavity.nodes()):
-        node_color[list(T_focus.nodes()).index(node)] = colors[0]
+        node_color[node_ids[node]] = colors[0]
     for edge in list(T_cavity.edges()):
-        if edge in list(T_focus.edges()):
-            edge_color[list(T_focus.edges()).index(edge)] = colors[0]
-        else:
-            edge_color[list(T_focus.edges()).index((edge[1], edge[0]))] = colors[0]
-    node_color[list(T_focus.nodes()).index(center_node)] = np.array([1, 0, 0])
-    node_color[list(T_focus.nodes()).index(boundary_node)] = np.array([0, 0, 1])
+        edge_color[edge_ids[edge]] = colors[0]
+    node_color[node_ids[center_node]] = np.array([1, 0, 0])
+    node_color[node_ids[boundary_node]] = np.array([0, 0, 1])
     plt.figure(figsize=(figsize[0], figsize[1]))
     plt.clf()
     graph_draw(T_focus, pos=position_T, node_size=node_size, linewidths=3,width=3, node_color='w', edgecolors=node_color, edge_color=edge_color, node_shape=node_shape)
@@ -373,32 +342,27 @@ def process_animation_show(G, Ne, boundary_node, center_node, pause_time):
     for bid in range(len(boundary)):
         for node in list(cavity_Ts[bid].nodes()):
             if node not in boundary:
-                node_color[list(T_focus.nodes()).index(node)] = colors[bid+1]
+                node_color[node_ids[node]] = colors[bid+1]
         for edge in list(cavity_Ts[bid].edges()):
-            if edge in list(T_focus.edges()):
-                edge_color[list(T_focus.edges()).index(edge)] = colors[bid+1]
-            else:
-                edge_color[list(T_focus.edges()).index((edge[1], edge[0]))] = colors[bid+1]
+            edge_color[edge_ids[edge]] = colors[bid+1]
         for node in boundaries_sub_cavity[bid]:
-            node_shape[list(T_focus.nodes()).index(node)] = 'd'
+            node_shape[node_ids[node]] = 'd'
         plt.figure(figsize=(figsize[0], figsize[1]))
         plt.clf()
-        graph_draw(T_focus, pos=nx.kamada_kawai_layout(T_focus), node_size=node_size, linewidths=3,width=3, node_color='w', edgecolors=node_color, edge_color=edge_color, node_shape=node_shape)
+        graph_draw(T_focus, pos=position_T, node_size=node_size, linewidths=3,width=3, node_color='w', edgecolors=node_color, edge_color=edge_color, node_shape=node_shape)
         plt.show()
         display.clear_output(wait=True)
         plt.pause(pause_time)
         for node in list(cavity_Ts[bid].nodes()):
-            if len(list(T_focus.neighbors(node))) == 1 and boundary[bid] in list(T_focus.neighbors(node)):
-                node_shape[list(T_focus.nodes()).index(node)] = 'd'
+            if T_focus.degree(node) == 1 and T_focus.has_edge(node, boundary[bid]):
+                node_shape[node_ids[node]] = 'd'
                 message_vector_id = node
             elif node not in boundary:
-                node_color[list(T_focus.nodes()).index(node)] = np.array([1, 1, 1])
-                node_size[list(T_focus.nodes()).index(node)] = 0
+                node_color[node_ids[node]] = np.array([1, 1, 1])
+                node_size[node_ids[node]] = 0
         for edge in list(cavity_Ts[bid].edges()):
-            if edge in list(T_focus.edges()) and edge[0] != message_vector_id and edge[1] != message_vector_id:
-                edge_color[list(T_focus.edges()).index(edge)] = np.array([1, 1, 1])
-            elif edge[0] != message_vector_id and edge[1] != message_vector_id:
-                edge_color[list(T_focus.edges()).index((edge[1], edge[0]))] = np.array([1, 1, 1])
+            if edge[0] != message_vector_id and edge[1] != message_vector_id:
+                edge_color[edge_ids[edge]] = np.array([1, 1, 1])
         plt.figure(figsize=(figsize[0], figsize[1]))
         plt.clf()
         graph_draw(T_focus, pos=position_T, node_size=node_size, linewidths=3,width=3, node_color='w', edgecolors=node_color, edge_color=edge_color, node_shape=node_shape)
@@ -409,12 +373,9 @@ def process_animation_show(G, Ne, boundary_node, center_node, pause_time):
     
     for node in list(T_cavity.nodes()):
         if node != boundary_node:
-            node_color[list(T_focus.nodes()).index(node)] = colors[0]
+            node_color[node_ids[node]] = colors[0]
     for edge in list(T_cavity.edges()):
-        if edge in list(T_focus.edges()):
-            edge_color[list(T_focus.edges()).index(edge)] = colors[0]
-        else:
-            edge_color[list(T_focus.edges()).index((edge[1], edge[0]))] = colors[0]
+        edge_color[edge_ids[edge]] = colors[0]
     plt.figure(figsize=(figsize[0], figsize[1]))
     plt.clf()
     graph_draw(T_focus, pos=position_T, node_size=node_size, linewidths=3,width=3, node_color='w', edgecolors=node_color, edge_color=edge_color, node_shape=node_shape)
@@ -423,19 +384,17 @@ def process_animation_show(G, Ne, boundary_node, center_node, pause_time):
     plt.pause(pause_time)
     
     for node in list(T_cavity.nodes()):
-        if len(list(T_focus.neighbors(node))) == 1 and boundary_node in list(T_focus.neighbors(node)):
-            node_shape[list(T_focus.nodes()).index(node)] = 'd'
+        if T_focus.degree(node) == 1 and T_focus.has_edge(node, boundary_node):
+            node_shape[node_ids[node]] = 'd'
             position_T[node] = deepcopy(position_T[boundary_node])
             position_T[node][0] -= 0.2
             message_vector_id = node
         elif node != boundary_node:
-            node_color[list(T_focus.nodes()).index(node)] = np.array([1,1,1])
-            node_size[list(T_focus.nodes()).index(node)] = 0
+            node_color[node_ids[node]] = np.array([1,1,1])
+            node_size[node_ids[node]] = 0
     for edge in list(T_cavity.edges()):
-        if edge in list(T_focus.edges()) and edge[0] != message_vector_id and edge[1] != message_vector_id:
-            edge_color[list(T_focus.edges()).index(edge)] = np.array([1,1,1])
-        elif edge[0] != message_vector_id and edge[1] != message_vector_id:
-            edge_color[list(T_focus.edges()).index((edge[1],edge[0]))] = np.array([1,1,1])
+        if edge[0] != message_vector_id and edge[1] != message_vector_id:
+            edge_color[edge_ids[edge]] = np.array([1,1,1])
     plt.figure(figsize=(figsize[0],figsize[1]))
     plt.clf()
     graph_draw(T_focus, pos=position_T, node_size=node_size, linewidths=3,width=3, node_color='w', edgecolors=node_color, edge_color = edge_color, node_shape=node_shape)
@@ -473,15 +432,46 @@ def graph_draw(G, pos, node_size, linewidths, width, node_color, edgecolors, edg
     title : str
         The title of the figure.
     """
-    for node in list(G.nodes()):
-        pos_node = {}
-        pos_node[node] = pos[node]
-        nx.draw_networkx_nodes(G, pos=pos_node,
-                               nodelist=[node],
-                               node_size=[node_size[list(G.nodes()).index(node)]],node_color=node_color,linewidths = linewidths,
-                               edgecolors=[edgecolors[list(G.nodes()).index(node)]],
-                               node_shape=node_shape[list(G.nodes()).index(node)],ax=ax)
+    nodes_draw(G, pos, node_size, linewidths, node_color, edgecolors, node_shape, ax)
     nx.draw_networkx_edges(G, pos=pos, edge_color=edge_color, width=width,ax=ax)
     if ax != None and title != None:
         ax.set_title(title, fontsize=30,pad=-30)
-    
\ No newline at end of file
+
+
+
+def nodes_draw(G, pos, node_size, linewidths, node_color, edgecolors, node_shape, ax=None):
+    """Plot the nodes of G with a single draw_networkx_nodes call for every node shape.
+
+    Parameters
+    ----------
+    G : nx.Graph
+    pos : dict[int,array]
+        The positions of the nodes in the figure. 
+    node_size : list of int
+        node_size[i] = size of the i-th node in list(G.nodes()).
+    linewidths : int
+        The border width of the nodes.
+    node_color :
+        The fill color of the nodes, either a single color or node_color[i] = fill color of the i-th node in list(G.nodes()).
+    edgecolors :
+        edgecolors[i] = border color of the i-th node in list(G.nodes()).
+    node_shape :
+        node_shape[i] = shape of the i-th node in list(G.nodes()).
+    ax : AxesSubplot
+        The coordinates in the entire figure when the drawn figure appears as a subfigure.
+    """
+    nodes = list(G.nodes())
+    node_ids_by_shape = {}
+    for node_id, shape in enumerate(node_shape):
+        node_ids_by_shape.setdefault(shape, []).append(node_id)
+    for shape, node_ids in node_ids_by_shape.items():
+        if isinstance(node_color, str):
+            fill_color = node_color
+        else:
+            fill_color = [node_color[node_id] for node_id in node_ids]
+        nx.draw_networkx_nodes(G, pos=pos,
+                               nodelist=[nodes[node_id] for node_id in node_ids],
+                               node_size=[node_size[node_id] for node_id in node_ids],
+                               node_color=fill_color, linewidths=linewidths,
+                               edgecolors=[edgecolors[node_id] for node_id in node_ids],
+                               node_shape=shape, ax=ax)
@@ -0,0 +1,104 @@
+import numpy as np
+import networkx as nx
+
+
+def read_graph(G_file, path="constants"):
+    """Read the graph structure from the given gexf file stored in path (by default "/constants") with integer node ids.
+
+    Parameters
+    ----------
+    G_file : str
+        The name of the file storing the graph structure upon which the model is defined, and the corresponding file should be in the gexf format.
+    path : str
+        The directory containing the file.
+
+    Returns
+    -------
+    G : nx.Graph
+        Contains the information of the graph structure.
+    """
+    G0 = nx.read_gexf('{}/{}.gexf'.format(path, G_file))
+    G = nx.Graph()
+    for edge in list(G0.edges()):
+        G.add_edge(int(edge[0]), int(edge[1]))
+    G.add_nodes_from([int(node) for node in G0.nodes()])
+    return G
+
+
+def read_model(G_file, J_file, h_file, path="constants"):
+    """Read the model parameters from the given files stored in path (by default "/constants") and convert them to the data type required for subsequent calculations.
+
+    Parameters
+    ----------
+    G_file : str
+        The name of the file storing the graph structure upon which the model is defined, and the corresponding file should be in the gexf format.
+    J_file : str
+        The name of the file storing the coupling constants and the corresponding file should be in the csv format. 
+        There should be |E(G)| lines of the J_file, each of which is in the format of (i, j, J_ij) for J_ij acting on edge (i, j) of G.
+    h_file : str
+        The name of the file storing the external fields and the corresponding file should be in the csv format.
+        There should be |V(G)| lines of the h_file, each of which should be a float representing the field h_i on node i.
+    path : str
+        The directory containing the files.
+
+    Returns
+    -------
+    G : nx.Graph
+        Contains the information of the graph structure.
+    J : array
+        The coupling constants array with a shape of [n, n], J[i][j] = J_ij for every edge (i, j) of G and in all other positions of J are filled with 0.
+    h : array
+        The field array with a shape of [n] and h[i] = h_i.
+    """
+    G = read_graph(G_file, path)
+    n = G.number_of_nodes()
+
+    data_edge = np.loadtxt(
+        open("{}/{}.csv".format(path, J_file), "rb"), delimiter=",")
+    J = np.zeros([n, n])
+    for row in data_edge:
+        J[int(row[0])][int(row[1])] = row[2]
+        J[int(row[1])][int(row[0])] = row[2]
+
+    data_field = np.loadtxt(
+        open("{}/{}.csv".format(path, h_file), "rb"), delimiter=",")
+    h = np.zeros([n, ])
+    for i in range(len(data_field)):
+        h[i] = data_field[i]
+
+    return G, J, h
+
+
+
+def read_models(G_file, J_files, h_files, path="constants"):
+    """Read an ensemble of models defined on the same graph, e.g. several random realizations of the coupling constants and the external fields,
+    and stack their parameters along a leading sample axis.
+
+    Parameters
+    ----------
+    G_file : str
+        The name of the file storing the graph structure shared by all the models, in the same format as in read_model.
+    J_files : list of str
+        The names of the files storing the coupling constants, J_files[s] for the s-th realization.
+    h_files : list of str
+        The names of the files storing the external fields, h_files[s] for the s-th realization.
+    path : str
+        The directory containing the files.
+
+    Returns
+    -------
+    G : nx.Graph
+        Contains the information of the graph structure.
+    J : array
+        The coupling constants array with a shape of [S, n, n], J[s] is the coupling constants array of the s-th realization.
+    h : array
+        The field array with a shape of [S, n], h[s] is the field array of the s-th realization.
+    """
+    Js = []
+    hs = []
+    for J_file, h_file in zip(J_files, h_files):
+        G, J, h = read_model(G_file, J_file, h_file, path)
+        Js.append(J)
+        hs.append(h)
+
+    return G, np.stack(Js), np.stack(hs)